@@ -5,81 +5,102 @@ from flask_caching import Cache
 # Local imports
 from yt_utils import YouTubeAccessor
 from yt_utils import YouTubeCategories
+from yt_utils import load_config
+from yt_utils import fetch
+from yt_utils import DEFAULT_REGION, region_path
+from refresher import DataRefresher
+from memo import memoize_on_data, memoize_setup
+from static_figures import StaticFigures
+from ytdb.store import file_version, load_mapped
 
 import pandas as pd
-import yaml
 import numpy as np
-from datetime import date, datetime, time, timedelta
+from datetime import date, time, timedelta
 import warnings
 
 
-with open("../config.yaml") as stream:
-    total_config = yaml.safe_load(stream)
-
-cats = YouTubeCategories(total_config["PATHS"]["CATEGORY_IDS"], local = total_config["LOCAL"])
+total_config = load_config()
 
 app = Dash(__name__, **total_config["APP_CONFIG"], external_stylesheets = [dbc.themes.MINTY])
-# Global cache?
-# cache = Cache()
-# cache.init_app(app.server, config = total_config["CACHE_CONFIG"])
-
-# Globals
-trending_df = None
-categories_df = None
-
-last_load_trending = None
-last_load_categories = None
+# Server-side cache of callback results, shared by all workers
+cache = Cache()
+cache.init_app(app.server, config = total_config["CACHE_CONFIG"])
+
+# Columns used by the pages, no other column is decoded or kept in memory
+DATA_COLUMNS = ["id", "queryTime", "title", "categoryId", "viewCount", "duration", "tags"]
+
+# Only the configured region's files are read
+region = total_config.get("REGION", DEFAULT_REGION)
+
+# Snapshots are memory-mapped from a shared uncompressed Arrow file, so all
+# workers share one copy through the page cache. They are (re)loaded by a
+# background thread, callbacks only read already-loaded snapshots.
+refresher = DataRefresher(interval = timedelta(hours = 1))
+refresher.register("trending", lambda: load_mapped(region_path(total_config["PATHS"]["TRENDING"], region), DATA_COLUMNS))
+refresher.register("categories", lambda: load_mapped(region_path(total_config["PATHS"]["CATEGORIES"], region), DATA_COLUMNS))
+refresher.register("cat_tags_hist", lambda: _load_etl(total_config["PATHS"]["CAT_TAGS_HIST"]))
+refresher.register("category_ids", lambda: _load_categories(region_path(total_config["PATHS"]["CATEGORY_IDS"], region)))
+memoize_setup(cache, refresher)
+
+# Figures independent of any input, rebuilt once per data version
+static_figures = StaticFigures(refresher)
+
+# Nothing is loaded at import, the server binds right away and warms up in the background
+refresher.start()
+
+def memoize(*names):
+    '''
+        Decorator memoizing a callback until the named snapshots are reloaded
+    '''
+    return memoize_on_data(cache, refresher, *names)
+
+def static_figure(*names):
+    '''
+        Decorator registering a figure builder that only depends on the named snapshots
+    '''
+    def decorator(builder):
+        static_figures.register(builder.__name__, builder, *names)
+        return builder
+    return decorator
+
+def _load_etl(url):
+    path = fetch(url)
+    df = pd.read_feather(path)
+    df.attrs["version"] = file_version(path)
+    return df
 
-cat_tags_hist_df = None
-cat_tags_hist_load = None
+def _load_categories(url):
+    # Versioned by file like the other snapshots, so an unchanged reload keeps memoized results
+    path = url if total_config["LOCAL"] else fetch(url)
+    categories = YouTubeCategories(path, local = True)
+    categories.attrs = {"version" : file_version(path)}
+    return categories
 
 def get_dataframe(what):
-    global trending_df
-    global categories_df
-    global last_load_trending
-    global last_load_categories
-
     dataframe = None
-    if what == "trending":
-        if _should_reload(trending_df, last_load_trending):
-            print("Loading trending...")
-            trending_df = pd.read_feather(total_config["PATHS"]["TRENDING"])
-            last_load_trending = datetime.now()
-        dataframe = trending_df
-    elif what == "categories":
-        if _should_reload(categories_df, last_load_categories):
-            print("Loading categories...")
-            categories_df = pd.read_feather(total_config["PATHS"]["CATEGORIES"])
-            last_load_categories = datetime.now()
-        dataframe = categories_df
+    if what in ("trending", "categories"):
+        dataframe = refresher.get(what)
     else:
         warnings.warn("Requesting a dataframe that does not exist")
     return dataframe
 
 def get_etl(what):
-    global cat_tags_hist_df
-    global cat_tags_hist_load
-
     dataframe = None
     if what == "cat_tags_hist":
-        if _should_reload(cat_tags_hist_df, cat_tags_hist_load):
-            print("Loading category tags histogram...")
-            cat_tags_hist_df = pd.read_feather(total_config["PATHS"]["CAT_TAGS_HIST"])
-            cat_tags_hist_load = datetime.now()
-        dataframe = cat_tags_hist_df
+        dataframe = refresher.get(what)
     else:
         warnings.warn("Requesting a dataframe that does not exist")
     return dataframe
 
-def _should_reload(df, load_time, hours=1):
-    return df is None or load_time <= datetime.now() - timedelta(hours=hours)
+def get_categories():
+    return refresher.get("category_ids")
 
 def get_last(df):
     return df.drop_duplicates(subset = df.yt.get_alias("id"), keep = "last", ignore_index = True).copy()
 
 def process_duration_category(df):
     df = get_last(df)
-    df[df.yt.get_alias("duration")] = df.yt["duration"].apply(df.yt.convert_pt_to_seconds)
-    df["log_duration"] = df.yt["duration"].apply(np.log)
-    df["categoryName"] = df.yt["categoryId"].map(cats.id_to_title)
+    df[df.yt.get_alias("duration")] = df.yt.duration_seconds()
+    df["log_duration"] = np.log(df.yt["duration"].astype("float64"))
+    df["categoryName"] = df.yt["categoryId"].map(get_categories().id_to_title)
     return df
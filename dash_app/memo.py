@@ -0,0 +1,56 @@
+import functools
+import hashlib
+
+
+def memoize_on_data(cache, refresher, *names):
+    '''
+        Memoizes a callback keyed by (callback, inputs, data versions)
+
+        Results are kept in the shared flask_caching cache (bounded by its CACHE_THRESHOLD).
+        Once the refresher loads new data the versions change, so stale results are never
+        served again, and the cache is cleared of them (see memoize_setup). Results are
+        stored wrapped in a tuple, so a callback returning None is memoized too.
+
+        Arguments:
+            cache     : flask_caching Cache
+            refresher : DataRefresher holding the snapshots the callback reads
+            names     : Names of the snapshots the callback reads
+    '''
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            versions = tuple(refresher.version(data) for data in names)
+            key = "memo:" + hashlib.sha256(repr((name, args, versions)).encode()).hexdigest()
+
+            # None is a miss, a memoized None is (None,)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached[0]
+
+            result = fn(*args)
+            cache.set(key, (result,))
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def memoize_setup(cache, refresher):
+    '''
+        Drops all memoized results whenever the refresher loads data of a new version
+
+        A reload of unchanged data (same DataRefresher.version, i.e. the "version" attr of
+        a mapped snapshot) keeps the results, which other worker processes still serve.
+    '''
+    versions = {}
+
+    def clear(name, _):
+        version = refresher.version(name)
+        if versions.get(name, version) != version:
+            cache.clear()
+        versions[name] = version
+
+    refresher.on_refresh(clear)
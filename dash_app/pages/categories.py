@@ -6,7 +6,7 @@ import plotly.express as px
 import plotly.figure_factory as ff
 
 from navbar import create_navbar
-from app import app, cats, get_dataframe, get_last
+from app import app, get_categories, get_dataframe, get_last, memoize, static_figure, static_figures
 
 def categories_page():
     return html.Div([
@@ -15,7 +15,7 @@ def categories_page():
         html.H4("WARNING: VERY SLOW"),
         html.Div(id = "empty"),
         dcc.Dropdown(
-            options = cats.titles,
+            options = get_categories().titles,
             id = "trending_category_id",
         ),
         dcc.Graph(id = "category_trending"),
@@ -27,10 +27,11 @@ def categories_page():
     Output("category_trending", "figure"),
     [Input("trending_category_id", "value")],
 )
+@memoize("categories")
 def update_category_trending(category_trending):
     if category_trending is not None and category_trending != [None]:
         df = get_dataframe("categories")
-        df = df[df.yt["categoryId"] == cats[category_trending]]
+        df = df[df.yt["categoryId"].isin(get_categories()[[category_trending]])]
 
         new_fig = px.line(
             df,
@@ -55,9 +56,13 @@ def update_category_trending(category_trending):
     [Input("empty", "value")]
 )
 def update_category_taglen(value):
+    return static_figures.get("category_taglen")
+
+@static_figure("categories")
+def category_taglen():
     df = get_dataframe("categories")
     df = get_last(df)
-    df["tagLen"] = df.yt["tags"].apply(lambda x: len(x) if x is not None else 0)
+    df["tagLen"] = df.yt["tags"].list.len().fillna(0)
 
     new_fig = px.scatter(
         df,
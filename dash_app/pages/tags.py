@@ -5,7 +5,7 @@ from plotly.subplots import make_subplots
 import plotly.graph_objects as go
 
 from navbar import create_navbar
-from app import app, cats, get_dataframe, get_etl, get_last
+from app import app, get_categories, get_dataframe, get_etl, get_last, static_figure, static_figures
 
 import pandas as pd
 
@@ -17,7 +17,7 @@ def tags_page():
         html.H3("Explore tags", className="header"),
         html.Div(id="empty"),
         dcc.Dropdown(
-            options=cats.titles,
+            options=get_categories().titles,
             id="cat_hist_data",
             className="dropdown"
         ),
@@ -28,7 +28,11 @@ def tags_page():
     Output("cat_tags_hist", "figure"),
     [Input("empty", "value")],
 )
-def tag_hists(value):
+def update_tag_hists(value):
+    return static_figures.get("tag_hists")
+
+@static_figure("cat_tags_hist")
+def tag_hists():
     cat_tags = get_etl("cat_tags_hist")
 
     cat_count = cat_tags.shape[0]
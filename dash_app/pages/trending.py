@@ -7,7 +7,7 @@ import plotly.figure_factory as ff
 import numpy as np
 
 from navbar import create_navbar
-from app import app, total_config, cats, get_dataframe, process_duration_category
+from app import app, total_config, get_categories, get_dataframe, process_duration_category, memoize, static_figure, static_figures
 
 def trending_page():
     return html.Div([
@@ -17,7 +17,7 @@ def trending_page():
 
         # Dropdown to select video category
         dcc.Dropdown(
-            options = cats.titles,
+            options = get_categories().titles,
             multi = True,
             id = "category_id",
             className="dropdown"
@@ -43,6 +43,7 @@ def trending_page():
     [Input("view_slider", "value"),
     Input("category_id", "value")],
 )
+@memoize("trending")
 def update_view_count_graph(view_slider, category_id):
     # Convert to int and the dataframe
     video_views = int(view_slider) * 1_000_000
@@ -54,7 +55,7 @@ def update_view_count_graph(view_slider, category_id):
     df = df[df.yt["id"].isin(ids)]
     # Only look at a certain category
     if category_id is not None and len(category_id) != 0:
-        category_ids = cats[category_id]
+        category_ids = get_categories()[category_id]
         df = df[df.yt["categoryId"].isin(category_ids)]
 
     # Create a figure with plotly express
@@ -77,18 +78,19 @@ def update_view_count_graph(view_slider, category_id):
     [Input("category_id", "value")],
     suppress_callback_exceptions = True,
 )
+@memoize("trending")
 def update_bar_chart_categories(category_id):
     df = get_dataframe("trending")
     df = df.drop_duplicates(df.yt.get_alias("id"))
     grouped = df.groupby(df.yt.get_alias("categoryId")).size().reset_index().copy()
     grouped.columns = [grouped.yt.get_alias("categoryId"), "count"]
     if category_id is not None and len(category_id) != 0:
-        category_ids = cats[category_id]
+        category_ids = get_categories()[category_id]
 
         # Prevent copy problem
         grouped = grouped[grouped.yt["categoryId"].isin(category_ids)].copy()
 
-    grouped[grouped.yt.get_alias("categoryId")] = grouped[grouped.yt.get_alias("categoryId")].map(cats.id_to_title)
+    grouped[grouped.yt.get_alias("categoryId")] = grouped[grouped.yt.get_alias("categoryId")].map(get_categories().id_to_title)
 
     new_fig = px.bar(
         grouped,
@@ -108,6 +110,10 @@ def update_bar_chart_categories(category_id):
     [Input("empty", "value")],
 )
 def update_trending_box_chart(value):
+    return static_figures.get("trending_box_chart")
+
+@static_figure("trending")
+def trending_box_chart():
     df = get_dataframe("trending")
     df = process_duration_category(df)
     new_fig = px.box(
@@ -127,6 +133,10 @@ def update_trending_box_chart(value):
     [Input("empty", "value")],
 )
 def update_log_duration_hist(value):
+    return static_figures.get("log_duration_hist")
+
+@static_figure("trending")
+def log_duration_hist():
     df = get_dataframe("trending")
     df = process_duration_category(df)
     unique_cats = df.yt["categoryName"].unique()
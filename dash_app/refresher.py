@@ -0,0 +1,129 @@
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+
+class DataRefresher(object):
+    '''
+        Loads data off the request path and swaps new versions in atomically
+
+        Callbacks only ever read an already-loaded snapshot through get. A background
+        thread reloads every registered snapshot each interval, and a failed reload
+        keeps serving the previous snapshot. Loads are single-flight: concurrent
+        callers waiting on a cold snapshot share one load instead of each starting one.
+    '''
+    def __init__(self, interval : timedelta = timedelta(hours = 1)):
+        '''
+            Arguments:
+                interval : Time between background reloads
+        '''
+        self.interval = interval
+
+        self.__loaders = {}
+        self.__locks = {}
+        self.__snapshots = {}
+        self.__versions = {}
+        self.__loaded_at = {}
+
+        self.__listeners = []
+        self.__thread = None
+        self.__stop = threading.Event()
+
+    def register(self, name : str, loader):
+        '''
+            Arguments:
+                name   : Name used to get the snapshot
+                loader : Function without arguments returning a new snapshot
+        '''
+        self.__loaders[name] = loader
+        self.__locks[name] = threading.Lock()
+        self.__versions[name] = 0
+
+    def on_refresh(self, listener):
+        '''
+            Calls listener(name, version) after every newly loaded snapshot
+        '''
+        self.__listeners.append(listener)
+
+    def get(self, name : str):
+        '''
+            Returns the current snapshot, only loading it if it was never loaded
+
+            Arguments:
+                name : Name of a registered snapshot
+        '''
+        snapshot = self.__snapshots.get(name)
+        if snapshot is None:
+            self.refresh(name, force = False)
+            snapshot = self.__snapshots[name]
+        return snapshot
+
+    def version(self, name : str):
+        '''
+            Token identifying the data of the current snapshot, loading it if needed
+
+            Snapshots carrying a "version" attr (see ytdb.store.mapped) are identified by
+            it, which is the same in every worker process. Otherwise the number of loads
+            of this process is used.
+        '''
+        snapshot = self.get(name)
+        return getattr(snapshot, "attrs", {}).get("version", self.__versions[name])
+
+    def loaded_at(self, name : str) -> datetime:
+        return self.__loaded_at.get(name)
+
+    def refresh(self, name : str, force : bool = True):
+        '''
+            Loads a new version of the snapshot and swaps it in
+
+            Arguments:
+                name  : Name of a registered snapshot
+                force : If False, does nothing when the snapshot got loaded meanwhile
+        '''
+        with self.__locks[name]:
+            # Someone else loaded it while we waited on the lock
+            if not force and name in self.__snapshots:
+                return
+
+            print(f"Loading {name}...")
+            snapshot = self.__loaders[name]()
+
+            # Single reference assignment, readers see the old or new snapshot
+            self.__snapshots[name] = snapshot
+            self.__loaded_at[name] = datetime.now()
+            self.__versions[name] += 1
+            version = self.__versions[name]
+
+        for listener in self.__listeners:
+            listener(name, version)
+
+    def start(self, warm : bool = True):
+        '''
+            Starts the background thread
+
+            Arguments:
+                warm : Whether to load every snapshot right away (in the background)
+        '''
+        if self.__thread is not None:
+            return
+
+        self.__thread = threading.Thread(target = self.__run, args = (warm,), daemon = True, name = "DataRefresher")
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop.set()
+
+    def __run(self, warm : bool):
+        if warm:
+            self.__refresh_all(force = False)
+
+        while not self.__stop.wait(self.interval.total_seconds()):
+            self.__refresh_all(force = True)
+
+    def __refresh_all(self, force : bool):
+        for name in list(self.__loaders):
+            try:
+                self.refresh(name, force = force)
+            except Exception:
+                # Keep serving the previous snapshot
+                traceback.print_exc()
@@ -0,0 +1,71 @@
+import json
+import threading
+import traceback
+
+
+class StaticFigures(object):
+    '''
+        Figures whose callbacks have no real inputs, built once per data version
+
+        Figures are rebuilt by the refresher thread right after it loads new data and
+        kept as plain figure JSON, so callbacks only return an already-built figure.
+        A figure requested before its data was ever refreshed is built on first use.
+    '''
+    def __init__(self, refresher):
+        '''
+            Arguments:
+                refresher : DataRefresher holding the snapshots the figures are built from
+        '''
+        self.__refresher = refresher
+        self.__builders = {}
+        self.__figures = {}
+        self.__lock = threading.RLock()
+
+        refresher.on_refresh(self.__on_refresh)
+
+    def register(self, name : str, builder, *names):
+        '''
+            Arguments:
+                name    : Name of the figure
+                builder : Function without arguments returning a plotly figure
+                names   : Names of the snapshots the figure is built from
+        '''
+        self.__builders[name] = (builder, names)
+
+    def get(self, name : str) -> dict:
+        '''
+            Returns the figure JSON (as dict) for the current data version
+        '''
+        _, names = self.__builders[name]
+        versions = tuple(self.__refresher.version(data) for data in names)
+
+        built = self.__figures.get(name)
+        if built is None or built[0] != versions:
+            built = self.build(name)
+        return built[1]
+
+    def build(self, name : str):
+        '''
+            Builds the figure and stores it with the data versions it was built from
+        '''
+        builder, names = self.__builders[name]
+
+        with self.__lock:
+            versions = tuple(self.__refresher.version(data) for data in names)
+            built = self.__figures.get(name)
+            if built is not None and built[0] == versions:
+                return built
+
+            # Serialized once, callbacks return plain JSON data
+            built = (versions, json.loads(builder().to_json()))
+            self.__figures[name] = built
+
+        return built
+
+    def __on_refresh(self, data : str, version):
+        for name, (_, names) in list(self.__builders.items()):
+            if data in names:
+                try:
+                    self.build(name)
+                except Exception:
+                    traceback.print_exc()
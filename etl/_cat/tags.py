@@ -1,19 +1,16 @@
 """For tag visualizations."""
 
-from collections import Counter
+from functools import lru_cache
 
+import numpy as np
 import pandas as pd
-import nltk
 
 from etl import misc
 
-nltk.download('stopwords')
-STOPWORDS = nltk.corpus.stopwords.words("english")
+EPOCH = pd.Timestamp(0, tz="UTC")
 
 
 def cat_tags(df, categories):
-    ts = misc.start_timer("category ETL")
-
     # Remove features containing the following strings
     drops = (
         "localizations", "liveStreamingDetails", "recordingDetails",
@@ -21,46 +18,240 @@ def cat_tags(df, categories):
     )
     tag_df = df.loc[:, [col for col in df.columns if not any(d in col for d in drops)]]
 
-    # Get only last month of data with tokenized/lowered/stopword-free tags
+    # Get only last month of data with tags
     tag_df = misc.last_month(tag_df)
     tag_df = tag_df.dropna(subset="snippet.tags")
-    tag_df["tags"] = tag_df["snippet.tags"].apply(__tokenize_tags)
 
     # CREATE DFS --------------------------------------------------------------
 
     # Save df for tag count histogram
     _tag_hist(tag_df, categories)
 
-    misc.end_timer("category ETL", ts)
+
+def cat_tags_incremental(df, categories, days: int = 30):
+    """Same histogram as cat_tags, updated from rows newer than the last run.
+
+    Per (category, day, tag) counts of every video's latest snapshot are kept
+    in etl/data/state/cat_tags, so a run only tokenizes the new rows and drops
+    whole expired days. The window is cut at day boundaries, so it may hold
+    up to a day more than cat_tags' rolling 30 days.
+
+    Parameters:
+        df: Categories data, rows at or before the watermark are skipped
+        categories: YouTubeCategories used to name the category ids
+        days: Days of data the histogram covers
+    """
+    state, meta = misc.load_state("cat_tags")
+    videos = state.get("videos", __empty_videos())
+    counts = state.get("counts", __empty_counts())
+
+    # Fold in only rows newer than the watermark
+    watermark = meta.get("watermark")
+    new = df[["id", "queryTime", "snippet.categoryId", "snippet.tags"]]
+    if watermark is not None:
+        new = new[new["queryTime"] > pd.Timestamp(watermark)]
+
+    if not new.empty:
+        videos, counts = _fold_tags(videos, counts, new)
+        watermark = new["queryTime"].max().isoformat()
+
+    # Subtract expired days
+    if watermark is not None:
+        cutoff = (pd.Timestamp(watermark) - pd.Timedelta(days=days)).floor("D")
+        videos = videos[videos["day"] >= cutoff].reset_index(drop=True)
+        counts = counts[counts["day"] >= cutoff].reset_index(drop=True)
+
+    misc.save_state("cat_tags", {"watermark": watermark}, videos=videos, counts=counts)
+
+    misc.save_df(_top_tags(videos, counts, categories), "cat_tags_hist")
+
+
+def cat_tags_watermark():
+    """Query time of the newest row folded in by cat_tags_incremental, if any."""
+    _, meta = misc.load_state("cat_tags")
+    watermark = meta.get("watermark")
+
+    return None if watermark is None else pd.Timestamp(watermark)
 
 
 # Histogram
 
-def _tag_hist(tag_df, categories):
+def _tag_hist(tag_df, categories, top: int = 10):
     # Get only latest videos
-    cat_tags = tag_df.drop_duplicates(subset="id", keep="last", ignore_index=True)
+    latest = tag_df.drop_duplicates(subset="id", keep="last", ignore_index=True)
 
-    # Get tags for each category
-    cat_tags = cat_tags.groupby("snippet.categoryId")["tags"].sum()
+    # One row per tokenized/lowered/stopword-free tag, in original order
+    tokens = __tokenize_tags(latest).reset_index(drop=True)
 
-    # Create column for category id and category name
-    cat_tags = pd.DataFrame(cat_tags).reset_index()
-    cat_tags["category"] = cat_tags["snippet.categoryId"].apply(lambda x: categories.id_to_title[x])
+    # Count tags per category on categorical codes. Ties keep the order in
+    # which tags first appeared in the category, like Counter.most_common
+    tokens["code"], uniques = pd.factorize(tokens["tag"])
+    tokens["position"] = np.arange(len(tokens))
+    counts = (
+        tokens.groupby(["snippet.categoryId", "code"], sort=False)["position"]
+        .agg(["size", "min"])
+        .reset_index()
+        .sort_values(["snippet.categoryId", "size", "min"],
+                     ascending=[True, False, True], kind="stable")
+    )
+    counts = counts.groupby("snippet.categoryId", sort=False).head(top)
+    counts["tag"] = uniques.take(counts["code"].to_numpy())
+
+    # Create column for category id, top tags and their counts
+    grouped = counts.groupby("snippet.categoryId", sort=True)
+    cat_tags = pd.DataFrame({
+        "tags": grouped["tag"].agg(list),
+        "counts": grouped["size"].agg(list),
+    })
 
-    # Count tags and get top 10
-    cat_tags["tags"] = cat_tags["tags"].apply(Counter)
-    cat_tags["tags"] = cat_tags["tags"].apply(lambda x: dict(x.most_common(10)))
+    # Categories whose tags were all stopwords still get a row
+    all_ids = np.sort(latest["snippet.categoryId"].unique())
+    cat_tags = cat_tags.reindex(all_ids)
+    cat_tags.index.name = "snippet.categoryId"
+    for col in ("tags", "counts"):
+        cat_tags[col] = cat_tags[col].apply(lambda x: x if isinstance(x, list) else [])
 
-    cat_tags["counts"] = cat_tags["tags"].apply(lambda x: list(x.values()))
-    cat_tags["tags"] = cat_tags["tags"].apply(lambda x: list(x.keys()))
+    cat_tags = cat_tags.reset_index()
+    cat_tags.insert(2, "category", cat_tags["snippet.categoryId"].map(categories.id_to_title))
 
     # Save result
     misc.save_df(cat_tags, "cat_tags_hist")
 
 
+# Incremental histogram
+
+def _fold_tags(videos, counts, new):
+    """Moves the tag counts of videos in new to their latest snapshot.
+
+    Every token gets an order key of (query time, rank in snapshot, position
+    in tags) so ties break in the order cat_tags would have seen them.
+    """
+    new = new.dropna(subset="snippet.tags")
+    rank = new.groupby("queryTime", sort=False).cumcount()
+    latest = new.assign(rank=rank).drop_duplicates(subset="id", keep="last")
+
+    seconds = (latest["queryTime"] - EPOCH) // pd.Timedelta(seconds=1)
+    latest = latest.assign(
+        day=latest["queryTime"].dt.floor("D"),
+        order=seconds * 10**7 + latest["rank"] * 10**3,
+    )
+
+    # Tokens as lists, one row per video, for the next time it is seen
+    tokens = __tokenize_tags(latest, keep=("id",))
+    latest["tokens"] = tokens.groupby(level=0, sort=False)["tag"].agg(list)
+    latest["tokens"] = latest["tokens"].apply(lambda x: x if isinstance(x, list) else [])
+
+    # Take back the counts of videos seen again
+    seen = videos["id"].isin(latest["id"])
+    removed = __explode_videos(videos[seen])
+    videos = pd.concat([
+        videos[~seen],
+        latest[["id", "snippet.categoryId", "day", "order", "tokens"]],
+    ], ignore_index=True)
+
+    added = __explode_videos(latest)
+    keys = ["snippet.categoryId", "day", "tag"]
+    counts = pd.concat([
+        counts,
+        added.groupby(keys, sort=False)["order"].agg(count="size", first="min").reset_index(),
+    ], ignore_index=True)
+    counts = counts.groupby(keys, sort=False).agg(count=("count", "sum"), first=("first", "min"))
+    counts["count"] = counts["count"].sub(removed.groupby(keys).size(), fill_value=0)
+    counts = counts[counts["count"] > 0]
+
+    # Removed tokens may have been the first of their tag, find the new first
+    stale = counts.index.isin(pd.MultiIndex.from_frame(removed[keys].drop_duplicates()))
+    if stale.any():
+        days = videos[videos["day"].isin(removed["day"].unique())]
+        first = __explode_videos(days).groupby(keys)["order"].min()
+        counts.loc[stale, "first"] = first.reindex(counts.index[stale]).to_numpy()
+
+    return videos, counts.reset_index().astype({"count": "int64", "first": "int64"})
+
+
+def _top_tags(videos, counts, categories, top: int = 10):
+    """Builds the cat_tags_hist frame from summed per-day counts."""
+    totals = (
+        counts.groupby(["snippet.categoryId", "tag"], sort=False)
+        .agg(size=("count", "sum"), min=("first", "min"))
+        .reset_index()
+        .sort_values(["snippet.categoryId", "size", "min"],
+                     ascending=[True, False, True], kind="stable")
+    )
+    totals = totals.groupby("snippet.categoryId", sort=False).head(top)
+
+    grouped = totals.groupby("snippet.categoryId", sort=True)
+    cat_tags = pd.DataFrame({
+        "tags": grouped["tag"].agg(list),
+        "counts": grouped["size"].agg(list),
+    })
+
+    # Categories whose tags were all stopwords still get a row
+    all_ids = np.sort(videos["snippet.categoryId"].unique())
+    cat_tags = cat_tags.reindex(all_ids)
+    cat_tags.index.name = "snippet.categoryId"
+    for col in ("tags", "counts"):
+        cat_tags[col] = cat_tags[col].apply(lambda x: x if isinstance(x, list) else [])
+
+    cat_tags = cat_tags.reset_index()
+    cat_tags.insert(2, "category", cat_tags["snippet.categoryId"].map(categories.id_to_title))
+
+    return cat_tags
+
+
 # Helpers
 
-def __tokenize_tags(tags):
-    out = " ".join(tags).lower().split()
-    out = [w for w in out if w not in STOPWORDS]
-    return out
+@lru_cache(maxsize=None)
+def stopwords():
+    """English stopwords, only downloaded if nltk does not have them yet."""
+    import nltk
+
+    try:
+        words = nltk.corpus.stopwords.words("english")
+    except LookupError:
+        nltk.download("stopwords")
+        words = nltk.corpus.stopwords.words("english")
+
+    return frozenset(words)
+
+
+def __explode_videos(videos):
+    """One row per stored token with its order key."""
+    tokens = videos[["snippet.categoryId", "day", "order", "tokens"]].explode("tokens")
+    tokens = tokens.dropna(subset="tokens").rename(columns={"tokens": "tag"})
+    tokens["order"] += tokens.groupby(level=0).cumcount()
+
+    return tokens
+
+
+def __empty_videos():
+    return pd.DataFrame({
+        "id": pd.Series(dtype=object),
+        "snippet.categoryId": pd.Series(dtype="int64"),
+        "day": pd.Series(dtype="datetime64[us, UTC]"),
+        "order": pd.Series(dtype="int64"),
+        "tokens": pd.Series(dtype=object),
+    })
+
+
+def __empty_counts():
+    return pd.DataFrame({
+        "snippet.categoryId": pd.Series(dtype="int64"),
+        "day": pd.Series(dtype="datetime64[us, UTC]"),
+        "tag": pd.Series(dtype=object),
+        "count": pd.Series(dtype="int64"),
+        "first": pd.Series(dtype="int64"),
+    })
+
+def __tokenize_tags(df, keep: tuple = ("snippet.categoryId",)):
+    """Explodes tag lists into lowered, whitespace-split, stopword-free tokens.
+
+    Tokens keep the index of the row they came from, in tag order.
+    """
+    tokens = df[[*keep, "snippet.tags"]].explode("snippet.tags").dropna(subset="snippet.tags")
+    tokens = tokens.assign(tag=tokens["snippet.tags"].astype(str).str.lower().str.split())
+    tokens = tokens.explode("tag").dropna(subset="tag")
+
+    tokens = tokens[~tokens["tag"].isin(stopwords())]
+
+    return tokens[[*keep, "tag"]]
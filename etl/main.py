@@ -1,78 +1,81 @@
 """Entry point for backend data ETL."""
 
-import yaml
+import argparse
 import os
 
 import pandas as pd
 
-from yt_utils import YouTubeCategories
+from yt_utils import DEFAULT_REGION, load_categories, load_config, region_path
+from ytdb.store import select
 
-import misc
+from runner import Input, Task, run
 
 # ETL function imports
-from _cat.tags import cat_tags
+from _cat.tags import cat_tags_incremental, cat_tags_watermark
 
 from _trend.views import trend_views
 
 
-# Load config with data paths and indication if local or online
-with open("../config.yaml") as stream:
-    total_config = yaml.safe_load(stream)
+# Columns read for the ETL functions, no other column is decoded
+CATEGORY_COLUMNS = ["id", "queryTime", "categoryId", "tags"]
 
 
 def main():
-    ts = misc.start_timer("load")
+    parser = argparse.ArgumentParser(description="Run the backend data ETL")
+    parser.add_argument("--force", "-f", action="store_true",
+                        help="Run every task, even if its inputs and code "
+                             "look unchanged (i.e. after changing yt_utils "
+                             "or ytdb code the tasks use)")
+    args = parser.parse_args()
 
     paths = __get_paths()
 
-    # Load trending data
-    # df_trend = pd.read_feather(paths["TRENDING"])
-
-    # Load categories data
-    df_cat = pd.read_feather(paths["CATEGORIES"])
-
-    # Load categories
-    categories = YouTubeCategories(paths["CATEGORY_IDS"],
-                                   local=total_config["LOCAL"])
-
-    misc.end_timer("load", ts)
-
     # Create data directory if it does not exist
     if not os.path.isdir("data"):
         os.makedirs("data")
 
-    # Perform ETL and save output in data folder
-    # call_trending_etl(df_trend, categories)
-    call_category_etl(df_cat, categories)
-
+    inputs = {
+        "trending": Input(paths["TRENDING"], load_trending),
+        "categories": Input(paths["CATEGORIES"], load_category_frame),
+        "category_ids": Input(paths["CATEGORY_IDS"], load_category_ids),
+    }
 
-def call_trending_etl(df_trend, categories):
-    # ADD/REMOVE TRENDING ETL FUNCTIONS
-    trend_fns = [
-        trend_views
+    # ADD/REMOVE ETL TASKS, inputs are names in inputs or outputs of tasks
+    tasks = [
+        # Task(trend_views, ["trending", "category_ids"], []),
+        Task(cat_tags_incremental, ["categories", "category_ids"], ["cat_tags_hist"]),
 
     ]
 
-    for fn in trend_fns:
-        fn(df_trend, categories)
+    # Perform ETL and save output in data folder
+    run(tasks, inputs, force=args.force)
 
 
-def call_category_etl(df_cat, categories):
-    # ADD/REMOVE CATEGORY ETL FUNCTIONS
-    cat_fns = [
-        cat_tags,
+# Loaders, called in the process running the task
+
+def load_trending(path):
+    return pd.read_feather(path)
 
-    ]
 
-    for fn in cat_fns:
-        fn(df_cat, categories)
+def load_category_frame(path):
+    # Only what the incremental ETL has not seen yet
+    return select(path, CATEGORY_COLUMNS, start=cat_tags_watermark())
+
+
+def load_category_ids(path):
+    # The runner already fetched remote files
+    return load_categories(path, local=True)
 
 
 def __get_paths():
+    total_config = load_config()
+    region = total_config.get("REGION", DEFAULT_REGION)
+
+    # Only the configured region's files are read
     paths = {
-        "TRENDING": total_config["PATHS"]["TRENDING"],
-        "CATEGORIES": total_config["PATHS"]["CATEGORIES"],
-        "CATEGORY_IDS": total_config["PATHS"]["CATEGORY_IDS"],
+        "TRENDING": region_path(total_config["PATHS"]["TRENDING"], region),
+        "CATEGORIES": region_path(total_config["PATHS"]["CATEGORIES"], region),
+        "CATEGORY_IDS": region_path(total_config["PATHS"]["CATEGORY_IDS"], region),
     }
 
     # if total_config["LOCAL"]:
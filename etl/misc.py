@@ -1,5 +1,8 @@
 """Misc. ETL utility fns."""
 
+import json
+import os
+import shutil
 import time
 import pandas as pd
 
@@ -11,7 +14,14 @@ def last_month(df: pd.DataFrame, time_feature_name: str = "queryTime"):
         df: DataFrame to reduce to only last month's data
         time_feature_name: Name of time feature to use to
     """
-    return df.set_index(time_feature_name).last("30D").reset_index()
+    times = df[time_feature_name]
+    keep = times > times.max() - pd.Timedelta(days=30)
+
+    # Nothing expired, avoid copying every column
+    if keep.all():
+        return df
+
+    return df.loc[keep].reset_index(drop=True)
 
 
 def save_df(df: pd.DataFrame, name: str):
@@ -27,10 +37,64 @@ def save_df(df: pd.DataFrame, name: str):
     df.to_feather(f"data/{name}.feather", compression="zstd")
 
 
-def start_timer(task_name: str):
-    print(f"Starting {task_name}...")
-    return time.perf_counter()
+def load_state(name: str):
+    """Loads ETL state saved with save_state.
+
+    Returns a dict of DataFrames and the state's metadata, both empty if no
+    state was saved yet.
+
+    Parameters:
+        name: Name (NOT filename) of the state
+
+    Example:
+        load_state('cat_tags') --> etl/data/state/cat_tags.json
+    """
+    pointer = f"data/state/{name}.json"
+    if not os.path.exists(pointer):
+        return {}, {}
+
+    with open(pointer) as f:
+        meta = json.load(f)
+
+    path = f"data/state/{meta['version']}"
+    tables = {
+        file.removesuffix(".feather"): pd.read_feather(os.path.join(path, file))
+        for file in os.listdir(path)
+    }
+
+    return tables, meta["meta"]
+
+
+def save_state(name: str, meta: dict, **tables: pd.DataFrame):
+    """Saves tables and metadata carried between ETL runs in etl/data/state.
+
+    Tables are written to a new directory and the json pointing at it is
+    replaced last, so a run that dies halfway leaves the previous state.
+
+    Parameters:
+        name: Name (NOT filename) of the state
+        meta: Json serializable metadata, i.e. a watermark
+        tables: DataFrames to save, by table name
+
+    Example:
+        save_state('cat_tags', {}, counts=df) --> etl/data/state/cat_tags.<ns>/counts.feather
+    """
+    version = f"{name}.{time.time_ns()}"
+    os.makedirs(f"data/state/{version}")
+
+    for table, df in tables.items():
+        df.to_feather(f"data/state/{version}/{table}.feather", compression="zstd")
+
+    pointer = f"data/state/{name}.json"
+    previous = None
+    if os.path.exists(pointer):
+        with open(pointer) as f:
+            previous = json.load(f)["version"]
+
+    with open(f"{pointer}.tmp", "w") as f:
+        json.dump({"version": version, "meta": meta}, f)
+    os.replace(f"{pointer}.tmp", pointer)
 
+    if previous is not None:
+        shutil.rmtree(f"data/state/{previous}", ignore_errors=True)
 
-def end_timer(task_name: str, ts: float):
-    print(f"Finished {task_name} in {time.perf_counter() - ts} sec.")
@@ -0,0 +1,244 @@
+"""Dependency-aware, parallel and cached runner for ETL tasks.
+
+Tasks declare the inputs they read and the artifacts they write in
+etl/data. A task runs once every task producing one of its inputs is done,
+tasks that do not depend on each other run in separate processes, and a
+task whose inputs and code are unchanged since its last run is skipped.
+
+Code is only compared by the source of the modules defining the task
+function and the loaders of its inputs. Changes to code they import from
+other modules (i.e. yt_utils, ytdb) are not noticed, run with force=True
+(main.py --force) after such a change.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from yt_utils import fetch
+from ytdb.store.mapped import file_version
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class Input:
+    """A file or store read by tasks, loaded in the process running the task.
+
+    Parameters:
+        path: Local path, store directory or URL
+        load: Picklable function taking the local path (remote files are
+            fetched beforehand) and returning the loaded input
+    """
+
+    def __init__(self, path: str, load):
+        self.path = path
+        self.load = load
+
+    def local_path(self):
+        """Returns a local path holding the input, remote files are fetched."""
+        return fetch(self.path)
+
+    def version(self, path: str = None):
+        """Returns a token that changes whenever the input changes.
+
+        Parameters:
+            path: Local path returned by local_path(), fetched if None
+        """
+        path = path or self.local_path()
+
+        if not os.path.isdir(path):
+            return file_version(path)
+
+        stats = [os.stat(os.path.join(root, name))
+                 for root, _, names in os.walk(path) for name in names]
+        return f"{len(stats)}:{max((s.st_mtime_ns for s in stats), default=0)}"
+
+    def code_version(self):
+        """Returns a hash of the source of the module defining load."""
+        return _module_version(self.load)
+
+
+class Task:
+    """A function called with its loaded inputs, in order, that saves outputs.
+
+    Parameters:
+        fn: Module level ETL function, i.e. fn(df, categories)
+        inputs: Names of Inputs or of outputs of other tasks
+        outputs: Names (NOT filenames) of the artifacts fn saves in etl/data
+        name: Name shown in the report, fn's name by default
+    """
+
+    def __init__(self, fn, inputs: list, outputs: list, name: str = None):
+        self.fn = fn
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.name = name or fn.__name__
+
+    def code_version(self):
+        """Returns a hash of the source of the module defining fn."""
+        return _module_version(self.fn)
+
+
+def run(tasks: list, inputs: dict, workers: int = None, force: bool = False,
+        state: str = "data/state/runner.json"):
+    """Runs tasks in dependency order and prints a timing and memory report.
+
+    Returns the report as a DataFrame with a row per task.
+
+    Parameters:
+        tasks: Tasks to run
+        inputs: Inputs by name, outputs of tasks are read from etl/data
+        workers: Maximum number of processes, os.cpu_count() if None
+        force: Run every task even if its fingerprint is unchanged, i.e.
+            after changing code the fingerprints do not cover
+        state: Json file holding the fingerprint of every task's last run
+    """
+    producers = {out: task for task in tasks for out in task.outputs}
+    for task in tasks:
+        for name in task.inputs:
+            if name not in inputs and name not in producers:
+                raise KeyError(f"{task.name}: no input or task output named {name!r}")
+
+    deps = {task.name: {producers[name].name for name in task.inputs if name in producers}
+            for task in tasks}
+    __check_acyclic(deps)
+
+    fingerprints = {}
+    if os.path.exists(state):
+        with open(state) as f:
+            fingerprints = json.load(f)
+
+    pending = {task.name: task for task in tasks}
+    done, failed = set(), set()
+    running = {}
+    report = []
+
+    # Python < 3.11 reuses workers, so peaks there can include earlier tasks
+    options = {"max_tasks_per_child": 1} if sys.version_info >= (3, 11) else {}
+
+    with ProcessPoolExecutor(max_workers=workers, **options) as pool:
+        while pending or running:
+            # Tasks downstream of a failure are not run
+            for name in [n for n in pending if deps[n] & failed]:
+                failed.add(name)
+                report.append(__row(pending.pop(name), "skipped"))
+
+            for name in [n for n in pending if deps[n] <= done]:
+                task = pending.pop(name)
+                # Fetched once here, workers load the local copy
+                paths = {n: inputs[n].local_path() for n in task.inputs if n in inputs}
+                fingerprint = __fingerprint(task, inputs, paths)
+
+                outputs_exist = all(os.path.exists(__output_path(out)) for out in task.outputs)
+                if not force and outputs_exist and fingerprints.get(name) == fingerprint:
+                    done.add(name)
+                    report.append(__row(task, "cached"))
+                    continue
+
+                loads = [(paths[n], inputs[n].load) if n in inputs
+                         else (__output_path(n), pd.read_feather)
+                         for n in task.inputs]
+                running[pool.submit(_run_task, task.fn, loads)] = (task, fingerprint)
+
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                task, fingerprint = running.pop(future)
+                try:
+                    seconds, peak = future.result()
+                except Exception as e:
+                    failed.add(task.name)
+                    report.append(__row(task, f"failed: {type(e).__name__}: {e}"))
+                    continue
+
+                done.add(task.name)
+                fingerprints[task.name] = fingerprint
+                __save_fingerprints(fingerprints, state)
+                report.append(__row(task, "ran", seconds, peak))
+
+    report = pd.DataFrame(report, columns=["task", "status", "seconds", "peak MB"])
+    print(report.to_string(index=False))
+
+    if failed:
+        raise RuntimeError(f"ETL tasks failed: {', '.join(sorted(failed))}")
+
+    return report
+
+
+def _run_task(fn, loads: list):
+    """Loads inputs and calls fn in a worker, returns (seconds, peak MB)."""
+    ts = time.perf_counter()
+    fn(*[load(path) for path, load in loads])
+    seconds = time.perf_counter() - ts
+
+    # Workers run one task each (Python >= 3.11), so the process peak is the task's peak
+    peak = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak /= 2**20 if sys.platform == "darwin" else 2**10
+
+    return seconds, peak
+
+
+def _module_version(fn):
+    """Returns a hash of the source of the module defining fn."""
+    source = inspect.getsource(inspect.getmodule(fn))
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+# Helpers
+
+def __fingerprint(task, inputs, paths):
+    versions = [inputs[name].version(paths[name]) if name in inputs
+                else file_version(__output_path(name))
+                for name in task.inputs]
+    code = [task.code_version()] + [inputs[name].code_version()
+                                    for name in task.inputs if name in inputs]
+    key = json.dumps([code, task.inputs, task.outputs, versions])
+
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def __output_path(name):
+    return f"data/{name}.feather"
+
+
+def __save_fingerprints(fingerprints, state):
+    os.makedirs(os.path.dirname(state), exist_ok=True)
+    with open(f"{state}.tmp", "w") as f:
+        json.dump(fingerprints, f, indent=2)
+    os.replace(f"{state}.tmp", state)
+
+
+def __row(task, status, seconds=None, peak=None):
+    return [task.name, status, seconds, peak]
+
+
+def __check_acyclic(deps):
+    visiting, visited = set(), set()
+
+    def visit(name):
+        if name in visited:
+            return
+        if name in visiting:
+            raise ValueError(f"ETL tasks form a cycle through {name!r}")
+
+        visiting.add(name)
+        for dep in deps[name]:
+            visit(dep)
+        visiting.discard(name)
+        visited.add(name)
+
+    for name in deps:
+        visit(name)
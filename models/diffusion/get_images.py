@@ -10,7 +10,7 @@ import logging, os, time, sys
 from tqdm import tqdm
 import copy
 
-from yt_utils import YouTubeCategories
+from yt_utils import load_categories
 
 from unet import UNetModel
 from gaussian import GaussianDiffusion
@@ -39,7 +39,7 @@ def main() -> int:
     diffusion = GaussianDiffusion(config)
 
     log.info("Loading categories")
-    cats = YouTubeCategories("https://squeemos.pythonanywhere.com/static/video_categories.json", local = False)
+    cats = load_categories("https://squeemos.pythonanywhere.com/static/video_categories.json", local = False)
 
     log.info("Creating UNet")
     model = UNetModel(
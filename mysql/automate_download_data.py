@@ -1,28 +1,54 @@
 """Script for downloading data with the YouTube Data API client."""
 
+import argparse
 import json
+import os
 
 from reader import YouTubeReader
-from datetime import datetime
+from datetime import datetime, timedelta
 from pytz import timezone
 
-import googleapiclient.discovery
-import googleapiclient.errors
-
-def main():
-    try:
-        downloader = YoutubeDownloader("eric", "localhost", "mysql_key.txt", "./database/")
+from yt_utils import CategoryCapabilities, ETagCache, IngestScheduler, QuotaLimiter, RequestPool
+from yt_utils import DEFAULT_REGION, build_client, chart_missing, execute_all, execute_pages
+from yt_utils import not_modified, region_path
 
-        # Update category ids
-        category_ids = downloader.get_category_ids()
+from ytdb.store import ResponseLog
 
-        # Update trending videos
-        downloader.get_trending()
+import googleapiclient.errors
 
-        # Update category videos
-        downloader.get_categories(category_ids)
+def main():
+    parser = argparse.ArgumentParser(description="Download YouTube data into MySQL")
+    parser.add_argument("--daemon", "-d", action="store_true",
+                        help="Keep running and collect every interval, reusing "
+                             "the client and database connections")
+    parser.add_argument("--interval", "-i", type=float, default=60,
+                        help="Minutes between runs in daemon mode")
+    parser.add_argument("--jitter", "-j", type=float, default=2,
+                        help="Maximum random delay of each run in minutes")
+    parser.add_argument("--regions", "-R", type=_regions, default=[DEFAULT_REGION],
+                        help="Comma separated region codes to collect, i.e. "
+                             "US,GB,DE, each stored in its own databases")
+    parser.add_argument("--workers", "-w", type=int, default=8,
+                        help="Most requests in flight, across all regions")
+    parser.add_argument("--max-pages", "-p", type=int, default=4,
+                        help="Pages of 50 videos requested per chart, the API "
+                             "serves at most 200 videos (4 pages)")
+    parser.add_argument("--quota-rate", "-q", type=float, default=10,
+                        help="Most API quota units spent per second")
+    parser.add_argument("--reprobe-days", type=float, default=7,
+                        help="Days before a category without a chart is "
+                             "requested again")
+    parser.add_argument("--category-ids-hours", type=float, default=24,
+                        help="Hours the category id list is reused before "
+                             "being requested again")
+    args = parser.parse_args()
 
-        print("done")
+    try:
+        downloader = YoutubeDownloader("eric", "localhost", "mysql_key.txt", "./database/",
+                                       workers=args.workers, quota_rate=args.quota_rate,
+                                       reprobe_days=args.reprobe_days,
+                                       category_ids_hours=args.category_ids_hours,
+                                       regions=args.regions, max_pages=args.max_pages)
 
     # Something went wrong, log the exception
     except Exception as e:
@@ -30,113 +56,309 @@ def main():
             dt = datetime.now(timezone("UTC")).strftime("%Y-%m-%dT%H:%M:%SZ")
             print(f"{dt}: {type(e)}: {e}")
             f.write(f"{dt}: {type(e)}: {e}\n")
+        return
+
+    # Failed runs are logged to ./error.log, timing is kept in ingest_stats.json
+    scheduler = IngestScheduler(
+        downloader.collect,
+        interval=timedelta(minutes=args.interval),
+        jitter=timedelta(minutes=args.jitter),
+        stats_path=downloader.output_path + "ingest_stats.json",
+    )
+
+    try:
+        if args.daemon:
+            scheduler.run_forever()
+        else:
+            scheduler.run_once()
+    finally:
+        downloader.close()
 
 class YoutubeDownloader:
-    def __init__(self, username: str, hostname: str, key_filename: str, output_path: str) -> None:
-        # Build client
+    def __init__(self, username: str, hostname: str, key_filename: str, output_path: str,
+                 workers: int = 8, quota_rate: float = 10, reprobe_days: float = 7,
+                 category_ids_hours: float = 24, regions: list = (DEFAULT_REGION,),
+                 max_pages: int = 4) -> None:
+        # Build client once, every run reuses it
         self.youtube_client = self._build_client()
 
+        # Concurrent requests of all regions, spending quota units from one bucket
+        self.regions = list(regions)
+        self.workers = workers
+        self.max_pages = max_pages
+        self.limiter = QuotaLimiter(rate=quota_rate)
+
+        # Worker threads and their connections, shared by every phase and run
+        self.pool = RequestPool(workers)
+
         # Prepare database info
         with open(key_filename, "r") as file:
             self.key = file.read()
         self.username = username
         self.hostname = hostname
 
+        # One engine (connection pool) per database, shared by every run
+        self.engines = {}
+
         # Prepare file IO
         self.output_path = output_path
 
-    def get_trending(self, parts: str = None):
-        """Gets top trending videos in the US."""
-        print("getting trending videos...")
+        # Category ids and which of them have charts, kept between runs per region
+        self.capabilities = {
+            region: CategoryCapabilities(
+                self._region_path("category_capabilities.json", region),
+                ttl=timedelta(days=reprobe_days),
+                ids_ttl=timedelta(hours=category_ids_hours),
+            )
+            for region in self.regions
+        }
 
-        youtube_reader = YouTubeReader(self.username, self.key, self.hostname, "trending", "videos")
+        # Every page is logged before being inserted, see ytdb/download/replay_log.py
+        self.log = ResponseLog(output_path + "responses")
 
-        if parts is None:
-            parts = self._get_all_parts()
+        # Last etag of every chart, unchanged charts answer 304 and are skipped
+        self.etags = ETagCache(output_path + "etags.json",
+                               markers_path=output_path + "no_change.jsonl")
 
-        # Get data
-        request = self.youtube_client.videos().list(
-            part=parts,
-            chart="mostPopular",
-            maxResults=50,
-            regionCode="US"
-        )
-        response = request.execute()
-        print("got trending videos")
+    def close(self):
+        """Stops the worker threads, once the downloader is no longer used."""
+        self.pool.shutdown()
 
-        # Insert the new videos into table
-        youtube_reader.insert_videos(response)
-        print("trending videos inserted")
+    def collect(self, timer):
+        """Runs one collection, timing every phase with the given RunTimer.
 
-    def get_category_ids(self):
-        """Saves raw response data for video categories and returns list of ids."""
-        print("getting category ids...")
+        Each phase sends the requests of all regions at once.
+        """
+        # Update category ids
+        with timer.phase("category_ids"):
+            category_ids = self.get_category_ids()
 
-        request = self.youtube_client.videoCategories().list(
-            part="snippet",
-            regionCode="US"
-        )
-        response = request.execute()
-        print("got category ids")
+        # Update trending videos
+        with timer.phase("trending"):
+            self.get_trending()
+
+        # Update category videos
+        with timer.phase("categories"):
+            self.get_categories(category_ids)
 
-        with open(self.output_path + "video_categories.json", "w") as outfile:
-            json.dump(response, outfile, indent=2)
-        print("saved category ids")
+        print("done")
+
+    def get_trending(self, parts: str = None):
+        """Gets top trending videos of every region, unless a chart is unchanged.
 
-        # Return categories
-        category_ids = [cat["id"] for cat in response["items"]]
+        Up to max_pages pages of every chart are inserted as they arrive. A
+        failed region does not keep the others from being inserted, its
+        error is raised after.
+        """
+        print("getting trending videos...")
 
-        return category_ids
+        if parts is None:
+            parts = self._get_all_parts()
 
-    def get_categories(self, category_ids, parts: str = None):
-        """Gets top videos for all categories in the US that support this."""
+        # Get data
+        requests = {
+            region: self.youtube_client.videos().list(
+                part=parts,
+                chart="mostPopular",
+                maxResults=50,
+                regionCode=region
+            )
+            for region in self.regions
+        }
+        keys = {region: ETagCache.key("videos", region) for region in requests}
+        for region, request in requests.items():
+            self.etags.prepare(keys[region], request)
+
+        readers = {region: self._reader("trending", region) for region in requests}
+        stored, error = self._insert_pages(requests, keys, readers, "yt_trending")
+        for region in stored:
+            print(f"{region} trending videos inserted")
+
+        self.etags.save()
+
+        if error is not None:
+            raise error
+
+    def get_category_ids(self):
+        """Saves raw response data for video categories, returns ids by region.
+
+        Recently requested ids are reused without a request, the other
+        regions are requested at once.
+        """
+        category_ids = {region: capabilities.category_ids
+                        for region, capabilities in self.capabilities.items()
+                        if capabilities.category_ids is not None}
+        if category_ids:
+            print(f"category ids of {len(category_ids)} regions cached")
+
+        requests = {
+            region: self.youtube_client.videoCategories().list(
+                part="snippet",
+                regionCode=region
+            )
+            for region in self.regions if region not in category_ids
+        }
+        if requests:
+            print("getting category ids...")
+
+        for region, response in execute_all(requests, self.limiter, pool=self.pool).items():
+            if isinstance(response, Exception):
+                raise response
+            print(f"got {region} category ids")
+
+            with open(self._region_path("video_categories.json", region), "w") as outfile:
+                json.dump(response, outfile, indent=2)
+            print(f"saved {region} category ids")
+
+            # Return categories
+            category_ids[region] = [cat["id"] for cat in response["items"]]
+
+            self.capabilities[region].category_ids = category_ids[region]
+            self.capabilities[region].save()
+
+        return {region: category_ids[region] for region in self.regions}
+
+    def get_categories(self, category_ids: dict, parts: str = None):
+        """Gets top videos for all categories of every region that support this.
+
+        Categories remembered as chartless are skipped until they are due
+        for a new probe, and unchanged charts answer 304 and are skipped.
+        Up to max_pages pages of every chart are inserted as they arrive.
+
+        Params:
+            category_ids: Category ids by region code, see get_category_ids
+        """
         print("getting category videos...")
 
-        youtube_reader = YouTubeReader(self.username, self.key, self.hostname, "categories", "videos")
+        category_ids = dict(category_ids)
+        for region, ids in category_ids.items():
+            category_ids[region] = self.capabilities[region].with_charts(ids)
+            print(f"skipping {len(ids) - len(category_ids[region])} {region} "
+                  f"categories without charts")
+
+        readers = {region: self._reader("categories", region) for region in category_ids}
 
         if parts is None:
             parts = self._get_all_parts()
 
-        for cat_id in category_ids:
-            try:
-                # Get data
-                request = self.youtube_client.videos().list(
-                    part=parts,
-                    chart="mostPopular",
-                    maxResults=50,
-                    regionCode="US",
-                    videoCategoryId=cat_id,
-                )
-                response = request.execute()
-                print(f"got cat{cat_id} videos")
-
-                # Insert the new videos into table
-                youtube_reader.insert_videos(response)
-                print(f"cat{cat_id} videos inserted")
-            except googleapiclient.errors.HttpError:
-                print(f"cat{cat_id} chart not found or failed")
-
-        print("categories saved")
+        requests = {
+            (region, cat_id): self.youtube_client.videos().list(
+                part=parts,
+                chart="mostPopular",
+                maxResults=50,
+                regionCode=region,
+                videoCategoryId=cat_id,
+            )
+            for region, ids in category_ids.items() for cat_id in ids
+        }
+        keys = {(region, cat_id): ETagCache.key("videos", region, cat_id)
+                for region, cat_id in requests}
+        for chart, request in requests.items():
+            self.etags.prepare(keys[chart], request)
+
+        def first_page(chart, page):
+            # Only a chart or its 404 tells whether the chart exists
+            missing = chart_missing(page)
+            if missing or not isinstance(page, Exception):
+                self.capabilities[chart[0]].record(chart[1], not missing)
+
+        stored, error = self._insert_pages(requests, keys, readers, "yt_categories", first_page)
+        for region, cat_id in stored:
+            print(f"{region} cat{cat_id} videos inserted")
+
+        for capabilities in self.capabilities.values():
+            capabilities.save()
+        self.etags.save()
+
+        if error is not None and not isinstance(error, googleapiclient.errors.HttpError):
+            raise error
+
+    def _insert_pages(self, requests: dict, keys: dict, readers: dict, name: str,
+                      first_page=None):
+        """Inserts every page of the chart requests as soon as it arrives.
+
+        Only one page per worker is held in memory, whatever the number of
+        pages. Every page is appended to the response log before it is
+        inserted. Charts answering 304 are logged as "no change" markers, and
+        the etag of a chart is only updated once all its pages are inserted.
+        Returns (inserted chart keys, first exception or None).
+
+        Params:
+            requests: First page requests by region or (region, category) key
+            keys: ETagCache keys of the requests
+            readers: YouTubeReader by region
+            name: Store name the pages are logged for, as in the file downloader
+            first_page: Called with (key, first page or exception) of every chart
+        """
+        # Next pages are sent without the first page's If-None-Match
+        def list_next(request, page):
+            return ETagCache.unconditional(self.youtube_client.videos().list_next(request, page))
+
+        charts = {}
+        failed = set()
+        error = None
+        pages = execute_pages(requests, list_next, self.limiter, max_pages=self.max_pages,
+                              pool=self.pool)
+        for key, page in pages:
+            region, category = (key, None) if isinstance(key, str) else key
+            chart = region if category is None else f"{region} cat{category}"
+            first = key not in charts and key not in failed
+            if first and first_page is not None:
+                first_page(key, page)
+
+            if first and not_modified(page):
+                self.etags.unchanged(keys[key], readers[region].query_time)
+                print(f"{chart} videos not modified")
+                failed.add(key)
+                continue
+
+            if isinstance(page, Exception):
+                print(f"{chart} chart not found or failed")
+                error = error or page
+                charts.pop(key, None)
+                failed.add(key)
+                continue
+
+            # Logged first, a failed insertion loses no response
+            self.log.append(page, readers[region].query_time, store=name, region=region,
+                            category=category)
+
+            # Insert the new videos into table
+            charts.setdefault(key, page.get("etag"))
+            readers[region].insert_videos(page)
+
+        # Only complete charts are answered 304 next time
+        for key, etag in charts.items():
+            self.etags.update(keys[key], {"etag": etag})
+
+        return list(charts), error
+
+    def _reader(self, dbname: str, region: str = DEFAULT_REGION):
+        """Returns a reader for this run, on the pooled engine of dbname.
+
+        Regions other than the default one have their own databases, i.e.
+        'trending_gb', so reading a region only touches its own tables.
+        """
+        if region != DEFAULT_REGION:
+            dbname = f"{dbname}_{region.lower()}"
+
+        if dbname not in self.engines:
+            self.engines[dbname] = YouTubeReader.create_engine(self.username, self.key, self.hostname, dbname)
+
+        return YouTubeReader(self.username, self.key, self.hostname, dbname, "videos",
+                             engine=self.engines[dbname])
+
+    def _region_path(self, name: str, region: str):
+        """Returns the path of name in region's directory, creating the directory."""
+        path = region_path(self.output_path + name, region)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return path
 
     @staticmethod
     def _build_client():
         """Creates and returns the YouTube Data API client needed for requests."""
         print("building client...")
-
-        api_key_path = "api_key.txt"
-
-        # API information
-        api_service_name = "youtube"
-        api_version = "v3"
-
-        # Read API key
-        with open(api_key_path, "r") as api_file:
-            api_key = api_file.read()
-
-        # Create the client with api_key
-        youtube = googleapiclient.discovery.build(
-            api_service_name, api_version, developerKey=api_key
-        )
+        youtube = build_client("api_key.txt")
         print("client built")
 
         return youtube
@@ -159,5 +381,13 @@ class YoutubeDownloader:
         return ",".join(parts)
 
 
+def _regions(text: str):
+    """Parses comma separated region codes, i.e. "us, gb" -> ["US", "GB"]."""
+    regions = [region.strip().upper() for region in text.split(",") if region.strip()]
+    if not regions:
+        raise argparse.ArgumentTypeError("no region code given")
+    return list(dict.fromkeys(regions))
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,47 @@
+"""Benchmark of df.yt.duration_seconds against the per-row regex parse."""
+
+import argparse
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from yt_utils import YouTubeAccessor
+
+
+def per_row(string):
+    # Previous YouTubeAccessor.convert_pt_to_seconds (counts digit groups)
+    times = [int(t) for t in re.findall(r"\d+", string)]
+    units = [86400, 3600, 60, 1][-len(times):]
+    return sum(t * u for t, u in zip(times, units))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description = "Benchmark duration parsing")
+    parser.add_argument("--rows", "-r", type = int, default = 1_000_000)
+    parser.add_argument("--unique", "-u", type = int, default = 5_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    seconds = rng.integers(1, 4 * 3600, args.unique)
+    uniques = [f"PT{s // 3600}H{s % 3600 // 60}M{s % 60}S".replace("PT0H", "PT") for s in seconds]
+    df = pd.DataFrame({"contentDetails.duration" : rng.choice(uniques, args.rows)})
+
+    start_time = time.perf_counter()
+    old = df["contentDetails.duration"].apply(per_row)
+    old_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    new = df.yt.duration_seconds()
+    new_time = time.perf_counter() - start_time
+
+    print(f"rows: {args.rows:,} ({args.unique:,} distinct)")
+    print(f"apply:            {old_time:8.3f} sec")
+    print(f"duration_seconds: {new_time:8.3f} sec ({old_time / new_time:.1f}x)")
+    print(f"identical: {bool((old.to_numpy() == new.to_numpy()).all())}")
+
+    return 0
+
+if __name__ == "__main__":
+    SystemExit(main())
@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 import yaml
 import os
@@ -12,6 +11,7 @@ from multiprocessing import Pool
 import argparse
 
 from yt_utils import YouTubeAccessor
+from ytdb.store import select
 
 # Download a video from a url
 def download_video(url, what, local_path, key, counter):
@@ -45,13 +45,16 @@ def main() -> int:
 
     keys = tuple(args.key)
 
+    # Only the columns used below are read
+    columns = [keys, args.what, "title", "queryTime"]
+
     print("Downloading dataframe...")
     if args.url:
-        df = pd.read_feather(args.url)
+        df = select(args.url, columns)
     elif args.config:
         with open(args.config) as stream:
             config = yaml.safe_load(stream)
-        df = pd.read_feather(config["PATHS"][args.table])
+        df = select(config["PATHS"][args.table], columns)
     else:
         raise Exception("Must pass in url or config")
     print("Dataframe downloaded\nBeginning extraction...")
@@ -2,7 +2,7 @@ from setuptools import setup, find_packages
 
 def main() -> int:
     # p = find_packages() # Maybe try and parse better?
-    packages = ['yt_utils', 'ytdb', 'ytdb.reader', 'ytdb.load']
+    packages = ['yt_utils', 'ytdb', 'ytdb.reader', 'ytdb.load', 'ytdb.store']
 
     setup(name = 'MRB', version = '1.0', packages = packages)
 
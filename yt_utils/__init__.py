@@ -1,2 +1,6 @@
 from .yt_accessor import YouTubeAccessor
-from .yt_categories import YouTubeCategories
+from .yt_categories import YouTubeCategories, load_categories
+from .yt_config import load_config
+from .yt_fetch import HTTPCache, fetch
+from .yt_ingest import CategoryCapabilities, ETagCache, IngestScheduler, QuotaExceeded, QuotaLimiter, RequestPool, RunTimer
+from .yt_ingest import DEFAULT_REGION, build_client, chart_missing, execute_all, execute_pages, not_modified, region_path
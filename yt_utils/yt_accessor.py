@@ -1,4 +1,5 @@
 from typing import Union
+import numpy as np
 import pandas as pd
 import re
 
@@ -28,6 +29,10 @@ class YouTubeAccessor(object):
         "thumbnails" : "snippet.thumbnails",
     }
 
+    # ISO-8601 durations: weeks, days, hours, minutes, seconds
+    duration_pattern = r"P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?"
+    duration_units = np.array([604800, 86400, 3600, 60, 1], dtype = "int64")
+
     # df is the dataframe to access
     def __init__(self, df : pd.DataFrame):
         self.__df = df
@@ -72,36 +77,67 @@ class YouTubeAccessor(object):
         return first
 
     def get_alias(self, item : Union[str, tuple[str]]) -> str:
+        return YouTubeAccessor.resolve(item)
+
+    @staticmethod
+    def resolve(item : Union[str, tuple[str]]) -> str:
+        '''
+            Column name of an alias without needing a DataFrame, used to build queries
+
+            Arguments:
+                item : Alias string or tuple of alias and nested keys
+        '''
         # If it's a string, just check the lookup
         if isinstance(item, str):
             return YouTubeAccessor.aliases.get(item, item)
 
         # If it's a tuple, we need to try to convert from multiple idnex
         elif isinstance(item, tuple):
-            return self.__multiple_index_alias(item)
+            first, *rest = item
+            return ".".join([YouTubeAccessor.aliases.get(first, first), *rest])
 
         else:
             raise NotImplementedError(f"Aliases with {type(item)} is not currently supported")
 
+    def duration_seconds(self, item : Union[str, tuple[str]] = "duration") -> pd.Series:
+        '''
+            Vectorized parse of an ISO-8601 duration column (PT#H#M#S, P#DT#H#M#S, P#W) into seconds
+
+            Each distinct duration is parsed once with pandas string extraction, which matters for
+            snapshot data where every video repeats hourly. Returns int64, or nullable Int64 if some
+            durations are missing or not valid ISO-8601 (all NA for an empty or all-null column).
+
+            Arguments:
+                item : Alias or column name of the duration column
+        '''
+        column = self.get(item)
+        codes, uniques = pd.factorize(column)
+
+        # Empty or all missing, there is nothing to parse
+        if len(uniques) == 0:
+            return pd.Series(pd.NA, index = column.index, name = column.name, dtype = "Int64")
+
+        parts = pd.Series(uniques, dtype = "string").str.extract(YouTubeAccessor.duration_pattern)
+        parts = parts.apply(pd.to_numeric).fillna(0).to_numpy(dtype = "int64")
+        seconds = parts @ YouTubeAccessor.duration_units
+
+        # Durations that did not match at all
+        valid = pd.Series(uniques, dtype = "string").str.fullmatch(YouTubeAccessor.duration_pattern).fillna(False).to_numpy()
+
+        # Missing durations have code -1, whose (last unique's) seconds are masked below
+        missing = codes == -1
+        missing[~missing] = ~valid[codes[~missing]]
+        result = pd.Series(seconds[codes], index = column.index, name = column.name)
+        if missing.any():
+            result = result.astype("Int64").mask(missing)
+        return result
+
     @staticmethod
     def convert_pt_to_seconds(string : str) -> int:
-        times = re.findall(r"\d+", string)
-        length = len(times)
-        # Seconds
-        if length == 1:
-            return int(times[0])
-        # Minutes, seconds
-        elif length == 2:
-            minutes, seconds = times
-            return int(minutes) * 60 + int(seconds)
-        # Hours, minutes, seconds
-        elif length == 3:
-            hours, minutes, seconds = times
-            return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
-        # Days, hours, minutes, seconds
-        elif length == 4:
-            days, hours, minutes, seconds = times
-            return int(days) * 86400 + int(hours) * 3600 + int(minutes) * 60 + int(seconds)
-        # Something unexpected
-        elif length == _:
-            raise Exception(f"More than 4 things parts to the time. {string} {times}")
+        '''
+            Parses a single ISO-8601 duration into seconds, use duration_seconds for columns
+        '''
+        match = re.fullmatch(YouTubeAccessor.duration_pattern, string)
+        if match is None:
+            raise ValueError(f"Not an ISO-8601 duration: {string}")
+        return int(sum(int(part) * unit for part, unit in zip(match.groups(), YouTubeAccessor.duration_units) if part))
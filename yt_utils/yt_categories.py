@@ -1,6 +1,8 @@
+from functools import lru_cache
 from typing import Union
 import json
-from urllib.request import urlopen
+
+from .yt_fetch import fetch
 
 class YouTubeCategories(object):
     '''
@@ -30,14 +32,13 @@ class YouTubeCategories(object):
         '''
             Arguments:
                 path  : String path to thing to open
-                local : Whether to load using urllib or json load
+                local : Whether to load from a local path or through the shared HTTP cache
         '''
-        if local:
-            with open(path) as link:
-                data = json.load(link)
-        else:
-            with urlopen(path) as link:
-                data = json.load(link)
+        if not local:
+            path = fetch(path)
+
+        with open(path) as link:
+            data = json.load(link)
 
         # Dictionary of id : category
         self.__id_to_title = {int(item["id"]) : item["snippet"]["title"] for item in data["items"]}
@@ -80,3 +81,14 @@ class YouTubeCategories(object):
     @property
     def id_to_title(self) -> dict[str:str]:
         return self.__id_to_title
+
+@lru_cache(maxsize = None)
+def load_categories(path : str, local : bool = False) -> YouTubeCategories:
+    '''
+        Returns the categories at path, loaded on first use and then shared by the process
+
+        Arguments:
+            path  : String path to thing to open
+            local : Whether to load from a local path or through the shared HTTP cache
+    '''
+    return YouTubeCategories(path, local = local)
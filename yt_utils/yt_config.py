@@ -0,0 +1,15 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize = None)
+def load_config(path : str = "../config.yaml") -> dict:
+    '''
+        Returns the parsed config.yaml, read on first use and then shared by the process
+
+        Arguments:
+            path : Path to the config, relative to the working directory
+    '''
+    import yaml
+
+    with open(path) as stream:
+        return yaml.safe_load(stream)
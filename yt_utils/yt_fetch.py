@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+
+class HTTPCache(object):
+    '''
+        On-disk cache of remote files (feathers, JSON) that revalidates with the server
+
+        Cached files are revalidated with ETag/If-Modified-Since, so unchanged data
+        costs a single conditional request. Files are replaced atomically, and the
+        least recently used ones are evicted once the cache grows over max_bytes.
+        Use is tracked with access times, modification times are download times.
+        The validators of every cached file are kept next to it, in a meta_suffix file.
+    '''
+    meta_suffix = ".meta.json"
+
+    def __init__(self, cache_dir : str = None, max_bytes : int = None):
+        '''
+            Arguments:
+                cache_dir : Directory holding cached files (MRB_CACHE_DIR or ~/.cache/mrb by default)
+                max_bytes : Size bound of the cache (MRB_CACHE_BYTES or 2 GiB by default)
+        '''
+        if cache_dir is None:
+            cache_dir = os.environ.get("MRB_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "mrb"))
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("MRB_CACHE_BYTES", 2 * 1024 ** 3))
+
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def fetch(self, url : str) -> str:
+        '''
+            Returns a local path holding the current content of url
+
+            Local paths are returned as they are. If the server cannot be reached,
+            the cached copy (if any) is returned.
+
+            Arguments:
+                url : Remote address (http/https) or local path
+        '''
+        if not url.startswith(("http://", "https://")):
+            return url
+
+        os.makedirs(self.cache_dir, exist_ok = True)
+        path = self.path(url)
+        meta = self._read_meta(url) if os.path.exists(path) else {}
+
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            with urlopen(Request(url, headers = headers)) as response:
+                self._write_atomic(path, response)
+                meta = {
+                    "url" : url,
+                    "etag" : response.headers.get("ETag"),
+                    "last_modified" : response.headers.get("Last-Modified"),
+                }
+                self._write_meta(url, meta)
+        except HTTPError as e:
+            # Not modified, the cached copy is current
+            if e.code != 304:
+                raise
+        except URLError:
+            # Offline, fall back to the cached copy
+            if not meta:
+                raise
+
+        # Mark as most recently used, keeping the download time as mtime
+        os.utime(path, (time.time(), os.stat(path).st_mtime))
+        self.evict(keep = path)
+
+        return path
+
+    def path(self, url : str) -> str:
+        '''
+            Local path of the cached copy of url (which may not exist yet)
+        '''
+        key = hashlib.sha256(url.encode()).hexdigest()[:32]
+        name = os.path.basename(url.split("?")[0])
+        return os.path.join(self.cache_dir, f"{key}-{name}")
+
+    def evict(self, keep : str = None):
+        '''
+            Removes least recently used files until the cache fits in max_bytes
+
+            Arguments:
+                keep : Path that is never evicted (the file just fetched)
+        '''
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and not entry.name.endswith((self.meta_suffix, ".tmp")):
+                stat = entry.stat()
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            for stale in (path, path + self.meta_suffix):
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+            total -= size
+
+    def _read_meta(self, url : str) -> dict:
+        try:
+            with open(self.path(url) + self.meta_suffix) as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_meta(self, url : str, meta : dict):
+        self._write_atomic(self.path(url) + self.meta_suffix, [json.dumps(meta).encode()])
+
+    def _write_atomic(self, path : str, chunks):
+        '''
+            Writes chunks (a response or list of bytes) to path so readers never see partial files
+        '''
+        fd, tmp_path = tempfile.mkstemp(dir = self.cache_dir, suffix = ".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                if isinstance(chunks, list):
+                    file.writelines(chunks)
+                else:
+                    for chunk in iter(lambda: chunks.read(1 << 20), b""):
+                        file.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+_default_cache = None
+
+def fetch(url : str) -> str:
+    '''
+        Returns a local path holding the current content of url, using the shared cache
+
+        Arguments:
+            url : Remote address (http/https) or local path
+    '''
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = HTTPCache()
+    return _default_cache.fetch(url)
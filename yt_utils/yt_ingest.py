@@ -0,0 +1,582 @@
+import json
+import os
+import queue
+import random
+import signal
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+
+# Region whose data keeps the unpartitioned paths, as collected before regions existed
+DEFAULT_REGION = "US"
+
+
+def region_path(path : str, region : str = DEFAULT_REGION) -> str:
+    '''
+        Returns the path of a region's own copy of the file, store or URL at path
+
+        Every region other than DEFAULT_REGION is kept in a 'regionCode=XX' directory
+        next to the default region's data, i.e. 'database/yt_trending.feather' becomes
+        'database/regionCode=GB/yt_trending.feather', so reading a region only touches
+        its own files.
+
+        Arguments:
+            path   : Path or URL of the default region's file or store
+            region : ISO 3166-1 alpha-2 region code
+    '''
+    if region == DEFAULT_REGION:
+        return path
+
+    head, sep, name = path.rstrip("/").rpartition("/")
+    return f"{head}{sep}regionCode={region}/{name}"
+
+
+def build_client(api_key_path : str = "api_key.txt", api_endpoint : str = None):
+    '''
+        Creates the YouTube Data API client, meant to be built once and reused
+
+        The discovery document bundled with googleapiclient is used, so building does
+        not go over the network. Requests sent with execute_all and execute_pages run on
+        the connections of a RequestPool instead of the client's own, so a RequestPool
+        shared by every run is what keeps connections alive between runs.
+
+        Arguments:
+            api_key_path : Path to the file holding the API key
+            api_endpoint : Base URL of the API, i.e. a local stand-in for tests
+    '''
+    import googleapiclient.discovery
+
+    with open(api_key_path, "r") as api_file:
+        api_key = api_file.read().strip()
+
+    client_options = None if api_endpoint is None else {"api_endpoint" : api_endpoint}
+
+    return googleapiclient.discovery.build(
+        "youtube", "v3", developerKey = api_key, cache_discovery = False, static_discovery = True,
+        client_options = client_options,
+    )
+
+
+class QuotaExceeded(Exception):
+    '''
+        Raised when a request would spend more quota units than the limiter's budget
+    '''
+
+
+class QuotaLimiter(object):
+    '''
+        Token bucket of YouTube Data API quota units, shared by threads
+
+        Every request acquires its cost in units (1 for videos.list and videoCategories.list,
+        100 for search.list) before it is sent. The bucket refills at rate units per second
+        up to capacity, so bursts are allowed but the sustained rate is bounded. The units
+        spent are counted against an optional budget, i.e. the daily quota.
+    '''
+    def __init__(self, rate : float = 10.0, capacity : float = 50.0, budget : int = None):
+        '''
+            Arguments:
+                rate     : Units added to the bucket per second
+                capacity : Most units the bucket holds, the largest burst
+                budget   : Most units spent in total before QuotaExceeded, unbounded if None
+        '''
+        self.rate = rate
+        self.capacity = capacity
+        self.budget = budget
+        self.used = 0
+
+        self.__tokens = capacity
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self, units : int = 1):
+        '''
+            Blocks until units are available and spends them
+
+            Arguments:
+                units : Quota cost of the request about to be sent
+        '''
+        with self.__lock:
+            if self.budget is not None and self.used + units > self.budget:
+                raise QuotaExceeded(f"{self.used} of {self.budget} quota units spent")
+            self.used += units
+
+            # Reserve the units now, then wait outside of the lock for the deficit to refill
+            now = time.monotonic()
+            self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated) * self.rate)
+            self.__updated = now
+            self.__tokens -= units
+            wait = -self.__tokens / self.rate if self.__tokens < 0 else 0
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def reset(self):
+        '''
+            Forgets the units spent, i.e. when the daily quota resets
+        '''
+        with self.__lock:
+            self.used = 0
+
+
+class RequestPool(object):
+    '''
+        Long-lived worker threads executing googleapiclient requests, one connection each
+
+        httplib2 connections are not thread safe, so every worker thread executes its
+        requests on its own connection, built on its first request and kept alive for all
+        of its next ones. A pool created once and shared by every phase and run (and shut
+        down once) reuses its connections instead of opening new ones every call.
+    '''
+    def __init__(self, workers : int = 8):
+        '''
+            Arguments:
+                workers : Number of worker threads, the most requests in flight
+        '''
+        self.workers = workers
+        self.__executor = ThreadPoolExecutor(max_workers = workers)
+        self.__local = threading.local()
+
+    def submit(self, fn, *args):
+        '''
+            Runs fn(*args) on a worker thread, returns its Future
+        '''
+        return self.__executor.submit(fn, *args)
+
+    def execute(self, request):
+        '''
+            Executes request on the connection of the calling worker thread
+        '''
+        if not hasattr(self.__local, "http"):
+            from googleapiclient.http import build_http
+            self.__local.http = build_http()
+        return request.execute(http = self.__local.http)
+
+    def shutdown(self):
+        '''
+            Waits for the submitted requests and stops the worker threads
+        '''
+        self.__executor.shutdown(wait = True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+
+@contextmanager
+def _request_pool(pool : RequestPool, workers : int):
+    '''
+        Yields pool, or a RequestPool of workers threads shut down on exit if pool is None
+    '''
+    if pool is not None:
+        yield pool
+        return
+
+    with RequestPool(workers) as pool:
+        yield pool
+
+
+def execute_all(requests : dict, limiter : QuotaLimiter = None, workers : int = 8, cost : int = 1,
+                pool : RequestPool = None) -> dict:
+    '''
+        Executes googleapiclient requests concurrently, returns {key : response or exception}
+
+        Arguments:
+            requests : Requests by key, i.e. {category_id : youtube.videos().list(...)}
+            limiter  : QuotaLimiter every request acquires cost units from, if any
+            workers  : Most requests in flight, if no pool is given
+            cost     : Quota units of one request
+            pool     : RequestPool executing the requests, a new one for this call if None
+    '''
+    def execute(request):
+        if limiter is not None:
+            limiter.acquire(cost)
+        return pool.execute(request)
+
+    results = {}
+    with _request_pool(pool, workers) as pool:
+        futures = {key : pool.submit(execute, request) for key, request in requests.items()}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                results[key] = e
+
+    return results
+
+
+def execute_pages(requests : dict, list_next, limiter : QuotaLimiter = None, workers : int = 8,
+                  cost : int = 1, max_pages : int = None, pool : RequestPool = None):
+    '''
+        Follows paged requests concurrently, yields (key, page or exception) as pages arrive
+
+        Every worker thread follows the nextPageToken chain of one request, requesting a
+        page as soon as the previous one arrived, while the caller stores the pages already
+        received. Pages are handed over one at a time and a worker waits for the caller to
+        take its page before requesting the next, so pages held in memory are bounded by
+        the number of workers, whatever the number of pages. Pages of a key are yielded in
+        order, and a chain stops at its first exception, i.e. QuotaExceeded from limiter.
+
+        Arguments:
+            requests  : First page requests by key, i.e. {region : youtube.videos().list(...)}
+            list_next : Function (request, page) -> request of the next page or None,
+                        i.e. youtube.videos().list_next
+            limiter   : QuotaLimiter every page acquires cost units from, if any
+            workers   : Most pages in flight, if no pool is given
+            cost      : Quota units of one page
+            max_pages : Most pages followed per key, all if None
+            pool      : RequestPool following the chains, a new one for this call if None
+    '''
+    pages = queue.Queue(maxsize = 1)
+    closed = threading.Event()
+
+    def hand_over(item) -> bool:
+        while not closed.is_set():
+            try:
+                pages.put(item, timeout = 0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def follow(key, request):
+        count = 0
+        while request is not None:
+            try:
+                if limiter is not None:
+                    limiter.acquire(cost)
+                page = pool.execute(request)
+            except Exception as e:
+                hand_over((key, e))
+                return
+
+            count += 1
+            request = None if max_pages is not None and count >= max_pages else list_next(request, page)
+            if not hand_over((key, page)):
+                return
+            del page
+
+    with _request_pool(pool, workers) as pool:
+        futures = [pool.submit(follow, key, request) for key, request in requests.items()]
+        try:
+            while True:
+                try:
+                    item = pages.get(timeout = 0.1)
+                except queue.Empty:
+                    # Workers hand their pages over before finishing, so once all are done
+                    # an empty queue means every page was yielded
+                    if all(future.done() for future in futures) and pages.empty():
+                        # Errors outside of a request (i.e. in list_next) are not lost
+                        for future in futures:
+                            if future.exception() is not None:
+                                raise future.exception()
+                        return
+                    continue
+                yield item
+        finally:
+            # The caller stopped early (or failed), release the waiting workers
+            closed.set()
+
+
+class CategoryCapabilities(object):
+    '''
+        Persisted knowledge of which category ids exist and which have a mostPopular chart
+
+        The category id list is reused for ids_ttl instead of being requested every run.
+        Categories whose chart answered 404 are skipped until their record is older than
+        ttl, then probed again. Other failures (quota, 5xx, network) are not remembered.
+    '''
+    def __init__(self, path : str, ttl : timedelta = timedelta(days = 7),
+                 ids_ttl : timedelta = timedelta(days = 1)):
+        '''
+            Arguments:
+                path    : Json file holding the capabilities
+                ttl     : Time before a category without a chart is probed again
+                ids_ttl : Time the category id list is reused before being requested again
+        '''
+        self.path = path
+        self.ttl = ttl
+        self.ids_ttl = ids_ttl
+
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except (FileNotFoundError, ValueError):
+            data = {}
+
+        self.__ids = data.get("ids")
+        self.__charts = data.get("charts", {})
+
+    @property
+    def category_ids(self) -> list:
+        '''
+            Category ids if they were requested less than ids_ttl ago, otherwise None
+        '''
+        if self.__ids is None or self.__expired(self.__ids["checked"], self.ids_ttl):
+            return None
+        return self.__ids["category_ids"]
+
+    @category_ids.setter
+    def category_ids(self, category_ids : list):
+        self.__ids = {"category_ids" : list(category_ids), "checked" : self.__now()}
+
+    def with_charts(self, category_ids : list) -> list:
+        '''
+            Category ids worth requesting: known charts, unknown ids and expired failures
+        '''
+        return [cat_id for cat_id in category_ids
+                if self.__charts.get(str(cat_id), {}).get("available", True)
+                or self.__expired(self.__charts[str(cat_id)]["checked"], self.ttl)]
+
+    def record(self, cat_id, available : bool):
+        '''
+            Remembers whether the chart of cat_id exists
+
+            Arguments:
+                cat_id    : Category id that was requested
+                available : False if the chart answered 404
+        '''
+        self.__charts[str(cat_id)] = {"available" : available, "checked" : self.__now()}
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir = directory, suffix = ".tmp")
+        with os.fdopen(fd, "w") as file:
+            json.dump({"ids" : self.__ids, "charts" : self.__charts}, file, indent = 2)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def __now() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    @staticmethod
+    def __expired(checked : str, ttl : timedelta) -> bool:
+        checked = datetime.strptime(checked, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo = timezone.utc)
+        return datetime.now(timezone.utc) - checked >= ttl
+
+
+def chart_missing(error : Exception) -> bool:
+    '''
+        Whether error is the API's answer for a category without a mostPopular chart
+    '''
+    return getattr(getattr(error, "resp", None), "status", None) == 404
+
+
+class ETagCache(object):
+    '''
+        Last etag of every (endpoint, region, category) response, for conditional requests
+
+        Requests are sent with If-None-Match, and an unchanged response comes back as a
+        304 without a body, so it is neither parsed nor stored. Every 304 is logged as a
+        "no change" marker line in markers_path instead, keeping the snapshot timeline
+        complete. Etags should only be updated once their response is stored, so a
+        failed write is fetched again on the next run.
+    '''
+    def __init__(self, path : str, markers_path : str = None):
+        '''
+            Arguments:
+                path         : Json file holding the etags
+                markers_path : Json lines file receiving a marker for every 304, if any
+        '''
+        self.path = path
+        self.markers_path = markers_path
+
+        try:
+            with open(path) as file:
+                self.__etags = json.load(file)
+        except (FileNotFoundError, ValueError):
+            self.__etags = {}
+
+    @staticmethod
+    def key(endpoint : str, region : str = DEFAULT_REGION, category : str = None) -> str:
+        return json.dumps([endpoint, region, None if category is None else str(category)])
+
+    def prepare(self, key : str, request):
+        '''
+            Makes request conditional on the last etag of key, returns request
+        '''
+        etag = self.__etags.get(key)
+        if etag is not None:
+            request.headers["If-None-Match"] = etag
+        return request
+
+    def update(self, key : str, response : dict):
+        '''
+            Remembers the etag of a stored response
+        '''
+        if response.get("etag") is not None:
+            self.__etags[key] = response["etag"]
+
+    def unchanged(self, key : str, query_time : str):
+        '''
+            Logs a "no change" marker for a 304 answered to key at query_time
+        '''
+        if self.markers_path is None:
+            return
+
+        endpoint, region, category = json.loads(key)
+        marker = {
+            "queryTime" : query_time, "endpoint" : endpoint, "regionCode" : region,
+            "videoCategoryId" : category, "etag" : self.__etags.get(key), "status" : "not_modified",
+        }
+        with open(self.markers_path, "a") as file:
+            file.write(json.dumps(marker) + "\n")
+
+    @staticmethod
+    def unconditional(request):
+        '''
+            Returns request without If-None-Match, i.e. for the next pages of a conditional first page
+        '''
+        if request is not None and "If-None-Match" in request.headers:
+            # list_next copies requests shallowly, the first page keeps its headers
+            request.headers = {k : v for k, v in request.headers.items() if k != "If-None-Match"}
+        return request
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir = directory, suffix = ".tmp")
+        with os.fdopen(fd, "w") as file:
+            json.dump(self.__etags, file, indent = 2)
+        os.replace(tmp_path, self.path)
+
+
+def not_modified(error : Exception) -> bool:
+    '''
+        Whether error is a 304 answer to a conditional request
+    '''
+    return getattr(getattr(error, "resp", None), "status", None) == 304
+
+
+class RunTimer(object):
+    '''
+        Wall time of the phases of a single collection run
+    '''
+    def __init__(self):
+        self.started = datetime.now(timezone.utc)
+        self.phases = {}
+        self.__start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name : str):
+        '''
+            Times the body of a with block, adding to the time of name
+
+            Arguments:
+                name : Name of the phase, i.e. "trending"
+        '''
+        ts = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - ts
+
+    @property
+    def seconds(self) -> float:
+        return time.perf_counter() - self.__start
+
+
+class IngestScheduler(object):
+    '''
+        Runs a collection job forever on a jittered interval, recording run timing
+
+        Runs are scheduled on a fixed grid (start + n * interval) plus a random delay of up
+        to jitter, so they neither drift nor hit the API at the same second every hour.
+        A run overrunning its slot skips the missed slots instead of queueing them. A failed
+        run is logged and the next one runs as scheduled. The timing of the last runs is
+        kept in stats_path, written atomically after every run.
+    '''
+    def __init__(self, job, interval : timedelta = timedelta(hours = 1),
+                 jitter : timedelta = timedelta(minutes = 2), stats_path : str = None,
+                 history : int = 48, error_log : str = "./error.log"):
+        '''
+            Arguments:
+                job        : Function taking a RunTimer, called once per run
+                interval   : Time between scheduled runs
+                jitter     : Upper bound of the random delay added to each run
+                stats_path : Json file receiving the timing of the last runs, if any
+                history    : Number of runs kept in stats_path
+                error_log  : File receiving the exceptions of failed runs
+        '''
+        self.job = job
+        self.interval = interval
+        self.jitter = jitter
+        self.stats_path = stats_path
+        self.history = history
+        self.error_log = error_log
+
+        self.runs = []
+        self.__stop = threading.Event()
+
+    def run_once(self) -> dict:
+        '''
+            Runs the job now and returns its timing
+        '''
+        timer = RunTimer()
+        error = None
+        try:
+            self.job(timer)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            self.__log_error(timer, error)
+
+        run = {
+            "started" : timer.started.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "seconds" : round(timer.seconds, 3),
+            "phases" : {name : round(seconds, 3) for name, seconds in timer.phases.items()},
+            "error" : error,
+        }
+        self.runs = (self.runs + [run])[-self.history:]
+        self.__save_stats()
+
+        print(f"run took {run['seconds']}s {run['phases']}" + (f", failed: {error}" if error else ""))
+        return run
+
+    def run_forever(self, run_now : bool = True):
+        '''
+            Runs the job every interval until stop is called or SIGTERM/SIGINT is received
+
+            Arguments:
+                run_now : Whether the first run starts right away or after one interval
+        '''
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, lambda *_: self.stop())
+
+        interval = self.interval.total_seconds()
+        slot = time.time() if run_now else time.time() + interval
+
+        while not self.__stop.is_set():
+            delay = slot - time.time() + random.uniform(0, self.jitter.total_seconds())
+            if self.__stop.wait(max(delay, 0)):
+                break
+
+            self.run_once()
+
+            # Next slot on the grid that is still ahead
+            slot += interval * max(1, -(-(time.time() - slot) // interval))
+
+    def stop(self):
+        self.__stop.set()
+
+    def __save_stats(self):
+        if self.stats_path is None:
+            return
+
+        directory = os.path.dirname(os.path.abspath(self.stats_path))
+        fd, tmp_path = tempfile.mkstemp(dir = directory, suffix = ".tmp")
+        with os.fdopen(fd, "w") as file:
+            json.dump({"interval" : self.interval.total_seconds(), "runs" : self.runs}, file, indent = 2)
+        os.replace(tmp_path, self.stats_path)
+
+    def __log_error(self, timer : RunTimer, error : str):
+        dt = timer.started.strftime("%Y-%m-%dT%H:%M:%SZ")
+        print(f"{dt}: {error}")
+        with open(self.error_log, "a") as f:
+            f.write(f"{dt}: {error}\n")
+            f.write(traceback.format_exc())
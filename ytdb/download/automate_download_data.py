@@ -1,155 +1,637 @@
 """Script for downloading data with the YouTube Data API client."""
 
+import argparse
 import json
+import os
 import pandas as pd
 
 from ytdb.reader.reader import YouTubeReader
-from datetime import datetime
+from ytdb.store import LAYOUTS, ResponseLog, open_store, write_feather, write_parquet
+from datetime import datetime, timedelta
 from pytz import timezone
 
-import googleapiclient.discovery
+from yt_utils import CategoryCapabilities, ETagCache, IngestScheduler, QuotaLimiter, RequestPool
+from yt_utils import DEFAULT_REGION, build_client, chart_missing, execute_all, execute_pages
+from yt_utils import not_modified, region_path
+
 import googleapiclient.errors
 
+# Videos of complete charts held before they are written, see _get_pages
+BUFFER_ROWS = 10_000
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Download YouTube data")
+    parser.add_argument("--layout", "-l", default="feather",
+                        choices=["feather", *LAYOUTS],
+                        help="Rewrite the .feather files, or append to "
+                             "date-partitioned stores (partitioned) or to video "
+                             "metadata plus statistics stores (split)")
+    parser.add_argument("--retention-days", "-r", type=int, default=30,
+                        help="Days of partitions to keep in store layouts")
+    parser.add_argument("--archive", "-a", type=str, default=None,
+                        help="Directory to move expired partitions into "
+                             "instead of deleting them")
+    parser.add_argument("--export-parquet", "-e", action="store_true",
+                        help="Also publish row-group-organized .parquet files "
+                             "for remote Range-request reads")
+    parser.add_argument("--daemon", "-d", action="store_true",
+                        help="Keep running and collect every interval, reusing "
+                             "the client and its connections")
+    parser.add_argument("--interval", "-i", type=float, default=60,
+                        help="Minutes between runs in daemon mode")
+    parser.add_argument("--jitter", "-j", type=float, default=2,
+                        help="Maximum random delay of each run in minutes")
+    parser.add_argument("--regions", "-R", type=_regions, default=[DEFAULT_REGION],
+                        help="Comma separated region codes to collect, i.e. "
+                             "US,GB,DE, each stored in its own partition")
+    parser.add_argument("--workers", "-w", type=int, default=8,
+                        help="Most requests in flight, across all regions")
+    parser.add_argument("--max-pages", "-p", type=int, default=4,
+                        help="Pages of 50 videos requested per chart, the API "
+                             "serves at most 200 videos (4 pages)")
+    parser.add_argument("--quota-rate", "-q", type=float, default=10,
+                        help="Most API quota units spent per second")
+    parser.add_argument("--reprobe-days", type=float, default=7,
+                        help="Days before a category without a chart is "
+                             "requested again")
+    parser.add_argument("--category-ids-hours", type=float, default=24,
+                        help="Hours the category id list is reused before "
+                             "being requested again")
+    parser.add_argument("--statistics-only", "-s", action="store_true",
+                        help="Only refresh the statistics of videos seen "
+                             "recently, requires the split layout")
+    parser.add_argument("--statistics-days", type=int, default=7,
+                        help="Days videos are refreshed for after they were "
+                             "last seen in statistics-only mode")
+    args = parser.parse_args()
+
+    if args.statistics_only and args.layout != "split":
+        parser.error("--statistics-only writes to the statistics store of the split layout")
+
+    output_path = "./database/"
+
+    # Build client once, every run reuses it
     try:
-        # Build client
         youtube = build_client()
-
-        # Prepare I/O
-        output_path = "./database/"
-        youtube_reader = YouTubeReader()
-
-        # Update trending videos
-        get_trending(youtube, youtube_reader, output_path)
-
-        # Update category ids
-        category_ids = get_category_ids(youtube, output_path)
-
-        # Update category videos
-        get_categories(youtube, youtube_reader, output_path, category_ids)
-
-        print("done")
-
-    # Something went wrong, log the exception
     except Exception as e:
         with open("./error.log", "a") as f:
             dt = datetime.now(timezone("UTC")).strftime("%Y-%m-%dT%H:%M:%SZ")
             print(f"{dt}: {type(e)}: {e}")
             f.write(f"{dt}: {type(e)}: {e}\n")
-
-
-def build_client():
-    """Creates and returns the YouTube Data API client needed for requests."""
-    print("building client...")
-
-    api_key_path = "./api_key.txt"
-
-    # API information
-    api_service_name = "youtube"
-    api_version = "v3"
-
-    # Read API key
-    with open(api_key_path, "r") as api_file:
-        api_key = api_file.read()
-
-    # Create the client with api_key
-    youtube = googleapiclient.discovery.build(
-        api_service_name, api_version, developerKey=api_key
+        return
+
+    # Every request of every run spends quota units from the same bucket
+    limiter = QuotaLimiter(rate=args.quota_rate)
+
+    # Worker threads and their connections, shared by every phase and run
+    pool = RequestPool(args.workers)
+
+    # Every response is logged before being converted, see replay_log.py
+    log = ResponseLog(output_path + "responses")
+
+    # Last etag of every chart, unchanged charts answer 304 and are skipped
+    etags = ETagCache(output_path + "etags.json",
+                      markers_path=output_path + "no_change.jsonl")
+
+    # Category ids and which of them have charts, kept between runs per region
+    capabilities = {
+        region: CategoryCapabilities(
+            _region_path(output_path, "category_capabilities.json", region),
+            ttl=timedelta(days=args.reprobe_days),
+            ids_ttl=timedelta(hours=args.category_ids_hours),
+        )
+        for region in args.regions
+    }
+
+    def job(timer):
+        if args.statistics_only:
+            with timer.phase("statistics"):
+                refresh_statistics(youtube, output_path, args.statistics_days,
+                                   limiter=limiter, regions=args.regions, log=log,
+                                   pool=pool)
+        else:
+            collect(youtube, output_path, args, timer, limiter, capabilities, etags, log,
+                    pool)
+
+    # Failed runs are logged to ./error.log, timing is kept in *ingest_stats.json
+    prefix = "statistics_" if args.statistics_only else ""
+    scheduler = IngestScheduler(
+        job,
+        interval=timedelta(minutes=args.interval),
+        jitter=timedelta(minutes=args.jitter),
+        stats_path=output_path + prefix + "ingest_stats.json",
     )
-    print("client built")
-
-    return youtube
 
-
-def get_trending(youtube, youtube_reader, output_path: str, parts: str = None):
-    """Gets top trending videos in the US."""
+    try:
+        if args.daemon:
+            scheduler.run_forever()
+        else:
+            scheduler.run_once()
+    finally:
+        pool.shutdown()
+
+
+def collect(youtube, output_path: str, args, timer, limiter=None,
+            capabilities=None, etags=None, log=None, pool=None):
+    """Runs one collection of trending and category videos of every region.
+
+    Each phase sends the requests of all regions at once, so a run takes
+    about as long for dozens of regions as for one as long as workers and
+    the quota rate allow.
+
+    Parameters:
+        youtube: YouTube Data API client
+        output_path: Directory holding the data
+        args: Parsed command line arguments
+        timer: RunTimer receiving the time of every phase
+        limiter: QuotaLimiter shared by the requests, if any
+        capabilities: CategoryCapabilities remembering charts by region, if any
+        etags: ETagCache making chart requests conditional, if any
+        log: ResponseLog every chart page is appended to first, if any
+        pool: RequestPool executing the requests, one per phase if None
+    """
+    # New reader for this run's query time
+    youtube_reader = YouTubeReader()
+
+    # Update trending videos
+    with timer.phase("trending"):
+        get_trending(youtube, youtube_reader, output_path, layout=args.layout,
+                     etags=etags, regions=args.regions, limiter=limiter,
+                     workers=args.workers, max_pages=args.max_pages, log=log,
+                     pool=pool)
+
+    # Update category ids
+    with timer.phase("category_ids"):
+        category_ids = get_category_ids(youtube, output_path, capabilities,
+                                        regions=args.regions, limiter=limiter,
+                                        workers=args.workers, pool=pool)
+
+    # Update category videos
+    with timer.phase("categories"):
+        get_categories(youtube, youtube_reader, output_path, category_ids,
+                       layout=args.layout, limiter=limiter, workers=args.workers,
+                       capabilities=capabilities, etags=etags,
+                       max_pages=args.max_pages, log=log, pool=pool)
+
+    # Drop whole days past the retention window
+    if args.layout != "feather":
+        with timer.phase("retention"):
+            apply_retention(output_path, args.layout, args.retention_days,
+                            args.archive, regions=args.regions)
+
+    # Publish files readable with HTTP Range requests
+    if args.export_parquet:
+        with timer.phase("export"):
+            export_parquet(output_path, args.layout, regions=args.regions)
+
+    print("done")
+
+
+def get_trending(youtube, youtube_reader, output_path: str, parts: str = None,
+                 layout: str = "feather", etags: ETagCache = None,
+                 regions: list = (DEFAULT_REGION,), limiter: QuotaLimiter = None,
+                 workers: int = 8, max_pages: int = 1, log: ResponseLog = None,
+                 pool: RequestPool = None, buffer_rows: int = BUFFER_ROWS):
+    """Gets top trending videos of every given region.
+
+    The charts of all regions are requested concurrently, up to max_pages
+    pages of 50 videos each, and each is stored in its region's partition
+    (see yt_utils.region_path). Unless layout is "feather", the videos are
+    appended to the 'yt_trending' store of that layout instead of rewriting
+    'yt_trending.feather'. With etags, an unchanged chart is only logged as a
+    "no change" marker. With log, every page is appended to it before being
+    converted. A failed region does not keep the others from being stored,
+    its error is raised after. The requests run on pool, or on workers
+    threads of their own if it is None. Complete charts are stored once
+    buffer_rows of their videos are held (see _get_pages).
+    """
     print("getting trending videos...")
 
     if parts is None:
         parts = _get_all_parts()
 
     # Get data
-    request = youtube.videos().list(
-        part=parts,
-        chart="mostPopular",
-        maxResults=50,
-        regionCode="US"
-    )
-    response = request.execute()
-    print("got trending videos")
-
-    # Insert the new videos into table
-    youtube_reader.insert_videos(response, output_path + "yt_trending.feather")
-    print("trending videos inserted")
+    requests = {
+        region: youtube.videos().list(
+            part=parts,
+            chart="mostPopular",
+            maxResults=50,
+            regionCode=region
+        )
+        for region in regions
+    }
+    keys = {region: ETagCache.key("videos", region) for region in requests}
+    if etags is not None:
+        for region, request in requests.items():
+            etags.prepare(keys[region], request)
+
+    def write(region, charts):
+        print(f"got {region} trending videos")
+        frames, etag = charts[region]
+
+        # Insert the new videos into table
+        _store(youtube_reader, frames, _region_path(output_path, "yt_trending", region), layout)
+        print(f"{region} trending videos inserted")
+
+        if etags is not None:
+            etags.update(keys[region], {"etag": etag})
+
+    error = _get_pages(youtube, youtube_reader, requests, write, limiter, workers,
+                       max_pages, etags, keys, log=log, name="yt_trending", pool=pool,
+                       buffer_rows=buffer_rows)
+
+    if etags is not None:
+        etags.save()
+
+    if error is not None:
+        raise error[1]
+
+
+def get_category_ids(youtube, output_path, capabilities: dict = None,
+                     regions: list = (DEFAULT_REGION,), limiter: QuotaLimiter = None,
+                     workers: int = 8, pool: RequestPool = None):
+    """Saves raw response data for video categories, returns ids by region.
+
+    Regions whose capabilities still hold recent ids are not requested and
+    their saved response is left as it is, the others are requested at once.
+
+    Parameters:
+        youtube: YouTube Data API client
+        output_path: Directory holding the data
+        capabilities: CategoryCapabilities by region, if any
+        regions: Region codes to return category ids of
+        limiter: QuotaLimiter shared by the requests, if any
+        workers: Most requests in flight, if no pool is given
+        pool: RequestPool executing the requests, if any
+    """
+    capabilities = capabilities or {}
+
+    category_ids = {}
+    for region in regions:
+        if region in capabilities and capabilities[region].category_ids is not None:
+            category_ids[region] = capabilities[region].category_ids
+    if category_ids:
+        print(f"category ids of {len(category_ids)} regions cached")
+
+    requests = {
+        region: youtube.videoCategories().list(
+            part="snippet",
+            regionCode=region
+        )
+        for region in regions if region not in category_ids
+    }
+    if not requests:
+        return category_ids
 
-
-def get_category_ids(youtube, output_path):
-    """Saves raw response data for video categories and returns list of ids."""
     print("getting category ids...")
-
-    request = youtube.videoCategories().list(
-        part="snippet",
-        regionCode="US"
-    )
-    response = request.execute()
-    print("got category ids")
-
-    with open(output_path + "video_categories.json", "w") as outfile:
-        json.dump(response, outfile, indent=2)
-    print("saved category ids")
-
-    # Return categories
-    category_ids = [cat["id"] for cat in response["items"]]
-
-    return category_ids
-
-
-def get_categories(youtube, youtube_reader, output_path, category_ids,
-                   parts: str = None):
-    """Gets top videos for all categories in the US that support this."""
+    for region, response in execute_all(requests, limiter, workers, pool=pool).items():
+        if isinstance(response, Exception):
+            raise response
+        print(f"got {region} category ids")
+
+        path = _region_path(output_path, "video_categories.json", region)
+        with open(path, "w") as outfile:
+            json.dump(response, outfile, indent=2)
+        print(f"saved {region} category ids")
+
+        # Return categories
+        category_ids[region] = [cat["id"] for cat in response["items"]]
+
+        if region in capabilities:
+            capabilities[region].category_ids = category_ids[region]
+            capabilities[region].save()
+
+    return {region: category_ids[region] for region in regions}
+
+
+def get_categories(youtube, youtube_reader, output_path, category_ids: dict,
+                   parts: str = None, layout: str = "feather",
+                   limiter: QuotaLimiter = None, workers: int = 8,
+                   capabilities: dict = None, etags: ETagCache = None,
+                   max_pages: int = 1, log: ResponseLog = None,
+                   pool: RequestPool = None, buffer_rows: int = BUFFER_ROWS):
+    """Gets top videos for all categories of every region that support this.
+
+    The charts of every (region, category) are requested concurrently by up
+    to workers threads, up to max_pages pages of 50 videos each, every page
+    spending a quota unit from limiter. Categories the region's capabilities
+    remember as chartless are skipped until they are due for a new probe.
+    With etags, unchanged charts answer 304 and are only logged as "no
+    change" markers. With log, every page is appended to it before being
+    converted. The complete charts of each region are merged into one write
+    to its partition, made once buffer_rows of their videos are held (see
+    _get_pages), so a run with few charts writes each region once.
+    Unless layout is "feather", all category videos of a region are appended
+    as a single fragment to the 'yt_categories' store of that layout instead
+    of rewriting 'yt_categories.feather'.
+
+    Parameters:
+        category_ids: Category ids by region code, see get_category_ids
+        capabilities: CategoryCapabilities by region code, if any
+        pool: RequestPool executing the requests, workers threads of their
+            own if None
+        buffer_rows: Most videos of complete charts held before writing
+    """
     print("getting category videos...")
 
     if parts is None:
         parts = _get_all_parts()
 
+    capabilities = capabilities or {}
+    category_ids = dict(category_ids)
+    for region, ids in category_ids.items():
+        if region in capabilities:
+            category_ids[region] = capabilities[region].with_charts(ids)
+            print(f"skipping {len(ids) - len(category_ids[region])} {region} "
+                  f"categories without charts")
+
+    requests = {
+        (region, cat_id): youtube.videos().list(
+            part=parts,
+            chart="mostPopular",
+            maxResults=50,
+            regionCode=region,
+            videoCategoryId=cat_id,
+        )
+        for region, ids in category_ids.items() for cat_id in ids
+    }
+    keys = {(region, cat_id): ETagCache.key("videos", region, cat_id)
+            for region, cat_id in requests}
+    if etags is not None:
+        for chart, request in requests.items():
+            etags.prepare(keys[chart], request)
+
+    def first_page(chart, page):
+        # Only a chart or its 404 tells whether the chart exists
+        missing = chart_missing(page)
+        region, cat_id = chart
+        if region in capabilities and (missing or not isinstance(page, Exception)):
+            capabilities[region].record(cat_id, not missing)
+
+    written = set()
+
+    def write(region, charts):
+        for _, cat_id in charts:
+            print(f"got {region} cat{cat_id} videos")
+
+        frames = [frame for frames, _ in charts.values() for frame in frames]
+        _store(youtube_reader, frames, _region_path(output_path, "yt_categories", region),
+               layout)
+        written.add(region)
+        print(f"{region} categories saved")
+
+        # Only stored charts are answered 304 next time
+        if etags is not None:
+            for chart, (_, etag) in charts.items():
+                etags.update(keys[chart], {"etag": etag})
+            etags.save()
+
+    error = _get_pages(youtube, youtube_reader, requests, write, limiter, workers,
+                       max_pages, etags, keys, first_page, log, "yt_categories", pool,
+                       buffer_rows)
+
+    for region in category_ids:
+        if region not in written:
+            print(f"no {region} category chart changed")
+
+    for capabilities_ in capabilities.values():
+        capabilities_.save()
+
+    if error is not None and not isinstance(error[1], googleapiclient.errors.HttpError):
+        raise error[1]
+
+
+def _get_pages(youtube, youtube_reader, requests, write, limiter, workers, max_pages,
+               etags=None, keys=None, first_page=None, log=None, name=None, pool=None,
+               buffer_rows=BUFFER_ROWS):
+    """Follows the pages of chart requests, writing the charts as they complete.
+
+    Every page is converted to a DataFrame as soon as it is received and its
+    response is dropped, so only about one response per worker is held at a
+    time. Complete charts are buffered by region until buffer_rows videos are
+    held, then the charts of every region are written, and the rest after
+    the last page. So at most about buffer_rows videos (plus the pages of
+    charts in flight) are held, whatever the number of regions and charts.
+    Charts answering 304 are logged as "no change" markers, charts with a
+    failed page are dropped whole (an HttpError is only printed).
+
+    Returns the first (key, exception), or None.
+
+    Parameters:
+        write: Called with (region, {key: ([DataFrame per page], etag of the
+            first page)}) of the buffered charts of a region, in request order
+        buffer_rows: Most videos of complete charts held before writing
+        first_page: Called with (key, first page or exception) of every chart
+        log: ResponseLog every page is appended to before being converted
+        name: Name of the store the pages are for, kept in the log
+        pool: RequestPool following the pages, if any
+    """
+    # Next pages are sent without the first page's If-None-Match
+    def list_next(request, page):
+        return ETagCache.unconditional(youtube.videos().list_next(request, page))
+
+    order = {key: i for i, key in enumerate(requests)}
+    charts = {}
+    complete = {}
+    buffered = 0
+    failed = set()
+    unchanged = set()
+    error = None
+
+    def flush():
+        for region, region_charts in complete.items():
+            write(region, dict(sorted(region_charts.items(), key=lambda item: order[item[0]])))
+        complete.clear()
+
+    pages = execute_pages(requests, list_next, limiter, workers, max_pages=max_pages,
+                          pool=pool)
+    for key, page in pages:
+        region = key if isinstance(key, str) else key[0]
+        first = key not in charts and key not in failed
+        if first and first_page is not None:
+            first_page(key, page)
+
+        if first and etags is not None and not_modified(page):
+            unchanged.add(key)
+            failed.add(key)
+            continue
+
+        if isinstance(page, Exception):
+            if isinstance(page, googleapiclient.errors.HttpError):
+                print(f"{_chart_name(key)} chart not found or failed")
+            error = error or (key, page)
+            charts.pop(key, None)
+            failed.add(key)
+            continue
+
+        # Logged first, a failed conversion or write loses no response
+        if log is not None:
+            log.append(page, youtube_reader.time, store=name, region=region,
+                       category=None if isinstance(key, str) else key[1])
+
+        frames, _ = charts.setdefault(key, ([], page.get("etag")))
+        frames.append(youtube_reader.videos_to_df(page))
+
+        # The last page of its chart, as execute_pages follows no further
+        if page.get("nextPageToken") is None or len(frames) == max_pages:
+            complete.setdefault(region, {})[key] = charts.pop(key)
+            buffered += sum(len(frame) for frame in frames)
+            if buffered >= buffer_rows:
+                flush()
+                buffered = 0
+
+    flush()
+
+    # Markers in request order, whatever order the charts arrived in
+    for key in requests:
+        if key in unchanged:
+            etags.unchanged(keys[key], youtube_reader.time)
+            print(f"{_chart_name(key)} videos not modified")
+
+    return error
+
+
+def _chart_name(key):
+    """Returns a printable name of a region or (region, category) chart key."""
+    return key if isinstance(key, str) else f"{key[0]} cat{key[1]}"
+
+
+def _store(youtube_reader, frames, path, layout):
+    """Writes the converted pages of charts of one region in one go.
+
+    Unless layout is "feather", they are appended as a single fragment to the
+    store at path, otherwise 'path.feather' is rewritten with its last month.
+    """
+    df_new = pd.concat(frames, ignore_index=True, sort=False)
+
+    if layout != "feather":
+        YouTubeReader.convert_datetimes(df_new)
+        open_store(path, layout).append(df_new)
+        return
+
     try:
-        df = pd.read_feather(output_path + "yt_categories.feather")
+        df = pd.read_feather(path + ".feather")
     except FileNotFoundError:
         df = pd.DataFrame()
 
-    cat_dfs = []
-    for cat_id in category_ids:
-        try:
-            # Get data
-            request = youtube.videos().list(
-                part=parts,
-                chart="mostPopular",
-                maxResults=50,
-                regionCode="US",
-                videoCategoryId=cat_id,
-            )
-            response = request.execute()
-            print(f"got cat{cat_id} videos")
-
-            # Insert the new videos into table
-            cat_dfs.append(youtube_reader.videos_to_df(response))
-            print(f"cat{cat_id} videos inserted")
-        except googleapiclient.errors.HttpError:
-            print(f"cat{cat_id} chart not found or failed")
-
     # Combine the data and the current dataframe
-    df = pd.concat([df] + cat_dfs, ignore_index=True, sort=False)
+    df = pd.concat([df, df_new], ignore_index=True, sort=False)
 
     # Convert datetimes
-    for dt_feat in YouTubeReader.dt_names:
-        df[dt_feat] = pd.to_datetime(df[dt_feat], utc=True)
+    YouTubeReader.convert_datetimes(df)
 
     # Get only last month
     df = youtube_reader.last_month(df)
 
-    df.to_feather(output_path + "yt_categories.feather", compression="zstd")
-    print("categories saved")
+    write_feather(df, path + ".feather")
+
+
+def refresh_statistics(youtube, output_path: str, days: int = 7,
+                       limiter: QuotaLimiter = None, workers: int = 8,
+                       regions: list = (DEFAULT_REGION,), log: ResponseLog = None,
+                       pool: RequestPool = None):
+    """Appends current statistics of recently seen videos to the split stores.
+
+    Every video charted in the last given days of 'yt_trending' or
+    'yt_categories' of any region is requested by id, once however many
+    regions it was seen in, 50 per videos.list(part="statistics") call, and
+    its statistics are appended to the store(s) it was seen in.
+    Videos keep a view time series after they leave the charts, at one quota
+    unit per 50 videos.
+
+    Parameters:
+        youtube: YouTube Data API client
+        output_path: Directory holding the stores
+        days: Days videos are refreshed for after they were last charted
+        limiter: QuotaLimiter every request spends a unit from, if any
+        workers: Most requests in flight, if no pool is given
+        regions: Region codes whose stores are refreshed
+        log: ResponseLog every response is appended to first, if any
+        pool: RequestPool executing the requests, workers threads of their
+            own if None
+    """
+    print("refreshing statistics...")
+
+    stores = {(region, name): open_store(_region_path(output_path, name, region), "split")
+              for region in regions for name in ("yt_trending", "yt_categories")}
+    seen = {name: store.recent_ids(days) for name, store in stores.items()}
+    ids = list(dict.fromkeys(video_id for ids in seen.values() for video_id in ids))
+
+    requests = {
+        start: youtube.videos().list(
+            part="id,statistics",
+            id=",".join(ids[start:start + 50]),
+            maxResults=50,
+        )
+        for start in range(0, len(ids), 50)
+    }
+    youtube_reader = YouTubeReader()
+    responses = []
+    for start, response in execute_all(requests, limiter, workers, pool=pool).items():
+        if isinstance(response, Exception):
+            raise response
+
+        # Logged with the stores every video is refreshed in, for replays
+        if log is not None:
+            batch = set(ids[start:start + 50])
+            log.append(response, youtube_reader.time, store="statistics",
+                       seen=[[region, name, [i for i in seen[region, name] if i in batch]]
+                             for region, name in stores])
+        responses.append(response)
+    print(f"got statistics of {len(ids)} videos in {len(requests)} requests")
+
+    if not responses:
+        return
+
+    df = youtube_reader.responses_to_df(responses)
+    YouTubeReader.convert_datetimes(df)
+
+    for key, store in stores.items():
+        store.append_statistics(df[df["id"].isin(seen[key])])
+    print("statistics saved")
+
+
+def apply_retention(output_path: str, layout: str, days: int,
+                    archive_path: str = None, regions: list = (DEFAULT_REGION,)):
+    """Drops or archives day partitions of both stores older than given days."""
+    for region in regions:
+        for name in ("yt_trending", "yt_categories"):
+            archive_root = None
+            if archive_path is not None:
+                archive_root = region_path(f"{archive_path}/{name}", region)
+            store = open_store(region_path(output_path + name, region), layout)
+            expired = store.retain(days, archive_root=archive_root)
+            print(f"{region} {name}: {len(expired)} expired partitions removed")
+
+
+def export_parquet(output_path: str, layout: str, regions: list = (DEFAULT_REGION,)):
+    """Writes both datasets of every region as single .parquet files."""
+    for region in regions:
+        for name in ("yt_trending", "yt_categories"):
+            path = region_path(output_path + name, region)
+            if layout == "feather":
+                df = pd.read_feather(path + ".feather")
+            else:
+                df = open_store(path, layout).read()
+
+            write_parquet(df, path + ".parquet")
+            print(f"{region} {name}.parquet exported")
+
+
+def _region_path(output_path: str, name: str, region: str):
+    """Returns the path of name in region's partition, creating its directory."""
+    path = region_path(output_path + name, region)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return path
+
+
+def _regions(text: str):
+    """Parses comma separated region codes, i.e. "us, gb" -> ["US", "GB"]."""
+    regions = [region.strip().upper() for region in text.split(",") if region.strip()]
+    if not regions:
+        raise argparse.ArgumentTypeError("no region code given")
+    return list(dict.fromkeys(regions))
 
 
 def _get_all_parts():
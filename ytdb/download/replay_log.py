@@ -0,0 +1,157 @@
+"""Script for rebuilding snapshot stores from the raw response log.
+
+Every response the downloader receives is appended to its ResponseLog
+(./database/responses) before being converted. Replaying the log converts
+the responses again with the current reader and schema, i.e. after a
+conversion bug or a schema change, and writes fresh stores to another
+directory.
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import pandas as pd
+
+from ytdb.reader.reader import YouTubeReader
+from ytdb.store import LAYOUTS, ResponseLog, open_store, write_feather
+from ytdb.store.partitioned import _to_utc
+from yt_utils import region_path
+
+STORES = ("yt_trending", "yt_categories")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild stores from the response log")
+    parser.add_argument("--log", default="./database/responses",
+                        help="Directory of the response log")
+    parser.add_argument("--output", "-o", default="./replayed/",
+                        help="Directory receiving the rebuilt stores")
+    parser.add_argument("--layout", "-l", default="feather",
+                        choices=["feather", *LAYOUTS],
+                        help="Layout of the rebuilt stores")
+    parser.add_argument("--stores", "-s", nargs="+", default=list(STORES),
+                        choices=STORES, help="Stores to rebuild")
+    parser.add_argument("--regions", "-R", nargs="+", default=None,
+                        help="Region codes to rebuild, all logged ones if omitted")
+    parser.add_argument("--start", default=None,
+                        help="Earliest query time to replay, i.e. 2022-09-14")
+    parser.add_argument("--end", default=None,
+                        help="Latest query time to replay")
+    parser.add_argument("--workers", "-w", type=int, default=None,
+                        help="Processes converting log segments, one per CPU by default")
+    args = parser.parse_args()
+
+    output_path = args.output if args.output.endswith("/") else args.output + "/"
+    replay(args.log, output_path, args.layout, args.stores, args.regions,
+           args.start, args.end, args.workers)
+
+
+def replay(log_root: str, output_path: str, layout: str = "feather",
+           stores: list = STORES, regions: list = None, start=None, end=None,
+           workers: int = None):
+    """Rebuilds stores from the responses of a ResponseLog.
+
+    Log segments (one per day) are decompressed and converted in parallel,
+    one process per segment, and written in log order by this process. Every
+    download run becomes one write per store and region. Statistics-only
+    refreshes are replayed into split stores.
+
+    Parameters:
+        log_root: Directory of the response log
+        output_path: Directory receiving the rebuilt stores, should be empty
+        layout: "feather" or a store layout, see ytdb.store.LAYOUTS
+        stores: Names of the stores to rebuild
+        regions: Region codes to rebuild, all if None
+        start: Earliest (inclusive) query time to replay, if any
+        end: Latest (inclusive) query time to replay, if any
+        workers: Most processes converting segments, os.cpu_count() if None
+
+    Returns:
+        Number of writes
+    """
+    log = ResponseLog(log_root)
+    segments = log.segments(start, end)
+    print(f"replaying {len(segments)} log segments...")
+
+    frames = {}
+    writes = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        runs = pool.map(_convert_segment, segments, repeat(log_root), repeat(stores),
+                        repeat(regions), repeat(start), repeat(end),
+                        repeat(layout == "split"))
+        for path, segment_runs in zip(segments, runs):
+            for (name, region, _), df, seen in segment_runs:
+                if name == "statistics":
+                    writes += _replay_statistics(output_path, df, seen, stores, regions)
+                    continue
+
+                if layout == "feather":
+                    frames.setdefault((name, region), []).append(df)
+                else:
+                    YouTubeReader.convert_datetimes(df)
+                    open_store(region_path(output_path + name, region), layout).append(df)
+                writes += 1
+            print(f"{path} replayed")
+
+    # Whole files are written once, with their last month like the downloader
+    for (name, region), dfs in frames.items():
+        df = YouTubeReader.convert_datetimes(pd.concat(dfs, ignore_index=True, sort=False))
+        path = region_path(output_path + name + ".feather", region)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        write_feather(YouTubeReader.last_month(df), path)
+
+    print(f"{writes} writes replayed")
+    return writes
+
+
+def _convert_segment(path, log_root, stores, regions, start, end, statistics):
+    """Converts the responses of one segment, grouped by download run.
+
+    Statistics refreshes are only converted if statistics is True.
+
+    Returns a list of ((store, region, query time), DataFrame, seen) in log
+    order, where seen holds the stores of every video of statistics runs.
+    """
+    log = ResponseLog(log_root)
+    runs = {}
+    for meta, response in log.read_segment(path):
+        time = meta["queryTime"]
+        if (start is not None and _to_utc(time) < _to_utc(start)) or \
+                (end is not None and _to_utc(time) > _to_utc(end)):
+            continue
+
+        name = meta.get("store")
+        if name == "statistics":
+            if not statistics:
+                continue
+        elif name not in stores or (regions is not None and meta["region"] not in regions):
+            continue
+
+        run = runs.setdefault((name, meta.get("region"), time), ([], []))
+        run[0].append(response)
+        run[1].extend(meta.get("seen", []))
+
+    return [(key, YouTubeReader(time=key[2]).responses_to_df(responses), seen)
+            for key, (responses, seen) in runs.items()]
+
+
+def _replay_statistics(output_path, df, seen, stores, regions):
+    """Appends statistics of a refresh to the split stores of its videos."""
+    YouTubeReader.convert_datetimes(df)
+
+    ids = {}
+    for region, name, video_ids in seen:
+        if name in stores and (regions is None or region in regions):
+            ids.setdefault((region, name), set()).update(video_ids)
+
+    for (region, name), video_ids in ids.items():
+        store = open_store(region_path(output_path + name, region), "split")
+        store.append_statistics(df[df["id"].isin(video_ids)])
+
+    return len(ids)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,13 +6,14 @@ are necessarily load-only.
 """
 
 import json
-from urllib.request import urlopen
 
 from tinydb import Storage
 
 from blosc2 import decompress
 from orjson import loads
 
+from yt_utils import fetch
+
 
 class OnlineJSONStorage(Storage):
     """Storage for opening and reading TinyDB databases hosted online.
@@ -21,8 +22,8 @@ class OnlineJSONStorage(Storage):
         data_url: Online address at which TinyDB data is retrievable.
     """
     def __init__(self, data_url: str):
-        response = urlopen(data_url)
-        self._db_bytes = response.read()
+        with open(fetch(data_url), "rb") as file:
+            self._db_bytes = file.read()
         self._data = self._load()
 
     def read(self):
@@ -45,8 +46,8 @@ class OnlineBetterJSONStorage(Storage):
         data_url: Online address at which TinyDB data is retrievable.
     """
     def __init__(self, data_url: str):
-        response = urlopen(data_url)
-        self._db_bytes = response.read()
+        with open(fetch(data_url), "rb") as file:
+            self._db_bytes = file.read()
 
         self._data = self._load()
 
@@ -5,11 +5,14 @@ from pytz import timezone
 
 import pandas as pd
 
+from ytdb.store import PartitionedStore, write_feather
+
 
 class YouTubeReader:
     """Reader for inserting YouTube Data API responses into Pandas DataFrames.
 
-    The DataFrames being created or updated must be feathered .feather files.
+    The DataFrames being created or updated must be feathered .feather files
+    or partitioned stores, both written with ytdb.store.SNAPSHOT_SCHEMA.
     """
 
     # Features to Encode -------------------------------------------------------
@@ -30,6 +33,8 @@ class YouTubeReader:
         "status.madeForKids",
     )
 
+    bool_values = {"true": True, "false": False, True: True, False: False}
+
     dt_names = (
         "queryTime",
         "snippet.publishedAt",
@@ -75,15 +80,34 @@ class YouTubeReader:
         )
 
         # Convert datetimes
-        for dt_feat in YouTubeReader.dt_names:
-            df[dt_feat] = pd.to_datetime(df[dt_feat], utc=True)
+        self.convert_datetimes(df)
 
         # Get only last month
         if last_month:
             df = self.last_month(df)
 
-        # Pickle dict
-        df.to_feather(path, compression="zstd")
+        # Save with typed, dictionary-encoded schema
+        write_feather(df, path)
+
+    def append_videos(self, data: dict, store):
+        """Appends client response data to the given store.
+
+        Unlike insert_videos, only the new entries are encoded and written as
+        a new fragment, so the cost of an insertion does not depend on the
+        amount of stored history.
+
+        Parameters:
+            data: YT API response as a dictionary
+            store: Root directory of either existing or new partitioned store,
+                or a store object (i.e. ytdb.store.VideoStore)
+        """
+        if isinstance(store, str):
+            store = PartitionedStore(store)
+
+        df = self.videos_to_df(data)
+        self.convert_datetimes(df)
+
+        return store.append(df)
 
     def videos_to_df(self, data: dict):
         """Takes a response for videos and returns a dataframe.
@@ -91,26 +115,41 @@ class YouTubeReader:
         Parameters:
             data: YT API response with category video data as a dictionary.
         """
-        # Create individual entries
-        entries = []
-        for item in data["items"]:
-            item = self._flatten_dict(item)
-
-            # Add time data to video
-            entry = {"queryTime": self.time}
-            entry.update(item)
+        return self.responses_to_df([data])
 
-            # Convert fields prior to insertion
-            self._encode_fields(entry)
+    def responses_to_df(self, responses: list):
+        """Takes several responses for videos and returns a single dataframe.
 
-            entries.append(entry)
+        All items are flattened in a single pass and fields are encoded per
+        column rather than per video.
 
-        df = pd.DataFrame(entries)
+        Parameters:
+            responses: YT API responses with video data as dictionaries.
+        """
+        items = [item for data in responses for item in data["items"]]
+        df = pd.json_normalize(items)
 
         # Drop all features containing substrings
         df = df.loc[:, [col for col in df.columns if not any(d in col for d in YouTubeReader.drop_substrings)]]
 
-        return pd.DataFrame(entries)
+        # Add time data to videos
+        df.insert(0, "queryTime", self.time)
+
+        # Convert fields prior to insertion
+        return self._encode_columns(df)
+
+    @staticmethod
+    def convert_datetimes(df: pd.DataFrame):
+        """Converts all datetime features of the given dataframe in place.
+
+        Parameters
+            df: DataFrame containing the features in dt_names
+        """
+        for dt_feat in YouTubeReader.dt_names:
+            if dt_feat in df:
+                df[dt_feat] = pd.to_datetime(df[dt_feat], utc=True)
+
+        return df
 
     @staticmethod
     def last_month(df: pd.DataFrame, time_feature_name: str = "queryTime"):
@@ -119,38 +158,37 @@ class YouTubeReader:
         Parameters
             df: DataFrame to reduce to only last month's data
             time_feature_name: Name of time feature to use to
+
+        Partitioned stores should use PartitionedStore.retain and
+        PartitionedStore.last instead, which never materialize expired rows.
         """
-        return df.set_index(time_feature_name).last("30D").reset_index()
+        times = df[time_feature_name]
+        keep = times > times.max() - pd.Timedelta(days=30)
+
+        # Nothing expired, avoid copying every column
+        if keep.all():
+            return df
+
+        return df.loc[keep].reset_index(drop=True)
+
+    # Helpers ------------------------------------------------------------------
 
     @staticmethod
-    def _encode_fields(entry: dict):
-        """Encodes some integer, boolean, datetime fields
+    def _encode_columns(df: pd.DataFrame):
+        """Encodes some integer, boolean fields of the given dataframe in place.
 
         Parameters
-            entry: Individual video entry to be inserted in table.
+            df: DataFrame of flattened video entries to be inserted in table.
         """
-        # Integer fields
+        # Integer fields, nullable so that a missing count (i.e. hidden likes)
+        # does not turn the whole column into floats
         for int_name in YouTubeReader.int_names:
-            try:
-                entry[int_name] = int(entry[int_name])
-            except (KeyError, ValueError):
-                pass
+            if int_name in df:
+                df[int_name] = pd.to_numeric(df[int_name], errors="coerce").astype("Int64")
 
-        # Boolean fields
+        # Boolean fields, the API sends some of these as "true"/"false"
         for bool_name in YouTubeReader.bool_names:
-            try:
-                if isinstance(entry[bool_name], str):
-                    entry[bool_name] = bool(entry[bool_name])
-            except (KeyError, ValueError):
-                pass
-
-        return entry
-
-    # Helpers ------------------------------------------------------------------
-
-    @staticmethod
-    def _flatten_dict(data: dict):
-        """Flattens first level of dictionary."""
-        flat = list(pd.json_normalize(data).T.to_dict().values())[0]
+            if bool_name in df and not pd.api.types.is_bool_dtype(df[bool_name]):
+                df[bool_name] = df[bool_name].map(YouTubeReader.bool_values)
 
-        return flat
+        return df
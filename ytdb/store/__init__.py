@@ -0,0 +1,10 @@
+"""Contains storage definitions for YouTube snapshot data."""
+
+from ytdb.store.partitioned import PartitionedStore
+from ytdb.store.video_store import VideoStore
+from ytdb.store.layouts import LAYOUTS, open_store
+from ytdb.store.mapped import file_version, load_mapped
+from ytdb.store.query import open_source, select
+from ytdb.store.remote import HTTPRangeFile, read_parquet
+from ytdb.store.schema import SNAPSHOT_SCHEMA, to_pandas, to_table, write_feather, write_parquet
+from ytdb.store.wal import ResponseLog
@@ -0,0 +1,24 @@
+"""Contains helpers for choosing between the snapshot store layouts."""
+
+from ytdb.store.partitioned import PartitionedStore
+from ytdb.store.video_store import VideoStore
+
+
+LAYOUTS = {
+    "partitioned": PartitionedStore,
+    "split": VideoStore,
+}
+
+
+def open_store(path: str, layout: str = "partitioned"):
+    """Returns the store of the given layout rooted at path.
+
+    Parameters:
+        path: Root directory of the store
+        layout: "partitioned" for wide snapshot fragments (PartitionedStore)
+            or "split" for video metadata plus statistics facts (VideoStore)
+    """
+    try:
+        return LAYOUTS[layout](path)
+    except KeyError:
+        raise NotImplementedError(f"Store layout {layout} is not supported")
@@ -0,0 +1,116 @@
+"""Contains memory-mapped, zero-copy loading of snapshot data.
+
+Snapshot sources (compressed feathers, Parquet files, stores) are converted
+once into an uncompressed Arrow IPC file. Every process that loads the
+snapshot memory-maps that file instead of decompressing its own copy, so
+N dashboard workers share one physical copy through the OS page cache and
+loading is nearly instant once the file exists.
+"""
+
+import hashlib
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+
+from yt_utils import fetch
+
+from ytdb.store.query import select
+
+
+DEFAULT_MAPPED_DIR = os.environ.get(
+    "MRB_MAPPED_DIR", os.path.join(tempfile.gettempdir(), "mrb_mapped")
+)
+
+
+def load_mapped(source: str, columns: list = None, mapped_dir: str = None):
+    """Returns a snapshot DataFrame backed by a shared memory-mapped file.
+
+    The IPC file is (re)built from source only if it is missing or older
+    than source. Every column is Arrow-backed (pd.ArrowDtype) and references
+    the mapped pages rather than a private copy, see read_ipc.
+
+    Parameters:
+        source: Path or URL of a .feather or .parquet file, or root directory
+            of a PartitionedStore or VideoStore
+        columns: YouTubeAccessor aliases or column names to load, all if None
+        mapped_dir: Directory holding the IPC files, DEFAULT_MAPPED_DIR if None
+    """
+    # Remote files are revalidated (and kept on disk) by the HTTP cache
+    source = fetch(source)
+    path = mapped_path(source, columns, mapped_dir)
+
+    if not os.path.exists(path) or os.path.getmtime(path) < _source_mtime(source):
+        write_ipc(pa.Table.from_pandas(select(source, columns), preserve_index=False), path)
+
+    return read_ipc(path)
+
+
+def mapped_path(source: str, columns: list = None, mapped_dir: str = None):
+    """Returns the IPC file path for the given source and columns."""
+    key = hashlib.sha256(repr((os.path.abspath(source), columns)).encode())
+    name = os.path.basename(os.path.normpath(source)).split(".")[0]
+    return os.path.join(mapped_dir or DEFAULT_MAPPED_DIR, f"{name}-{key.hexdigest()[:16]}.arrow")
+
+
+def write_ipc(table: pa.Table, path: str):
+    """Writes table to an uncompressed Arrow IPC file atomically.
+
+    Dictionary columns are stored as plain strings, which pandas fully
+    supports as Arrow-backed columns (dictionary ones cannot be sorted), and
+    chunks are combined so every column maps as one buffer.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    schema = pa.schema([
+        field.with_type(field.type.value_type)
+        if pa.types.is_dictionary(field.type) else field
+        for field in table.schema
+    ])
+    table = table.cast(schema).combine_chunks()
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def read_ipc(path: str):
+    """Memory-maps an uncompressed Arrow IPC file into a DataFrame.
+
+    Columns are Arrow-backed (pd.ArrowDtype), so numbers, strings and lists
+    alike stay views of the mapping, with nulls and without converting. The
+    DataFrame's "version" attr identifies the file contents, so that
+    processes mapping the same file agree on the data version.
+    """
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+
+    df = table.to_pandas(types_mapper=pd.ArrowDtype)
+    df.attrs["version"] = file_version(path)
+
+    return df
+
+
+def file_version(path: str):
+    """Returns a token that changes whenever the file at path is replaced."""
+    stat = os.stat(path)
+    return f"{os.path.basename(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def _source_mtime(source: str):
+    """Returns the latest modification time of a file or store directory."""
+    if not os.path.isdir(source):
+        return os.path.getmtime(source)
+
+    return max(
+        (os.path.getmtime(os.path.join(root, name))
+         for root, _, names in os.walk(source) for name in names),
+        default=0,
+    )
@@ -0,0 +1,251 @@
+"""Contains PartitionedStore, an append-only store of YouTube snapshots.
+
+Each insertion writes one small Parquet fragment under a hive-style
+'queryDate=YYYY-MM-DD' directory, so the cost of an insertion only depends on
+the number of new rows. Reading the store presents every fragment as a single
+logical table.
+
+Retention is a storage-level operation: whole day partitions that fall out of
+the retention window are dropped (or archived) without reading any rows, and
+reads for a time window skip every partition outside of it.
+"""
+
+import os
+import shutil
+import uuid
+from glob import glob
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from ytdb.store.schema import conform_schema, to_pandas, to_table
+
+
+class PartitionedStore:
+    """Append-only, date-partitioned Parquet dataset of YouTube snapshots.
+
+    Layout:
+        root/queryDate=2022-09-14/20220914T180000Z-1a2b3c4d.parquet
+        root/queryDate=2022-09-14/20220914T190000Z-5e6f7a8b.parquet
+        ...
+
+    Parameters:
+        root: Directory holding the dataset (created on first append)
+        time_feature_name: Name of the time feature used for partitioning
+    """
+
+    partition_name = "queryDate"
+    partition_format = "%Y-%m-%d"
+    compression = "zstd"
+
+    def __init__(self, root: str, time_feature_name: str = "queryTime"):
+        self.root = root
+        self.time_feature_name = time_feature_name
+
+    # Writing ------------------------------------------------------------------
+
+    def append(self, df: pd.DataFrame):
+        """Writes the given rows as new fragments, one per query date.
+
+        Existing fragments are never read or rewritten.
+
+        Parameters:
+            df: New snapshot rows containing the time feature
+
+        Returns:
+            List of paths of the written fragments
+        """
+        if df.empty:
+            return []
+
+        times = pd.to_datetime(df[self.time_feature_name], utc=True)
+
+        paths = []
+        for date, part in df.groupby(times.dt.strftime(self.partition_format),
+                                     sort=False):
+            directory = self.partition_path(date)
+            os.makedirs(directory, exist_ok=True)
+
+            # Fragments are named by their earliest query time so that sorted
+            # paths follow insertion order
+            stamp = times[part.index].min().strftime("%Y%m%dT%H%M%SZ")
+            path = os.path.join(directory, f"{stamp}-{uuid.uuid4().hex[:8]}.parquet")
+
+            table = to_table(part)
+            self._write_fragment(table, path)
+            paths.append(path)
+
+        return paths
+
+    # Retention ----------------------------------------------------------------
+
+    def retain(self, days: int = 30, now=None, archive_root: str = None):
+        """Drops or archives all day partitions older than the given window.
+
+        A partition is only removed once every row in it is older than the
+        window, so no rows are read or rewritten.
+
+        Parameters:
+            days: Number of days of data to keep
+            now: End of the retention window, current UTC time if None
+            archive_root: If given, expired partitions are moved into this
+                directory instead of being deleted
+
+        Returns:
+            List of dates (as strings) of the removed partitions
+        """
+        now = _to_utc(pd.Timestamp.now(tz="UTC") if now is None else now)
+        cutoff = (now - pd.Timedelta(days=days)).strftime(self.partition_format)
+
+        expired = [date for date in self.partitions() if date < cutoff]
+        for date in expired:
+            directory = self.partition_path(date)
+            if archive_root is None:
+                shutil.rmtree(directory)
+            else:
+                os.makedirs(archive_root, exist_ok=True)
+                shutil.move(directory, os.path.join(
+                    archive_root, os.path.basename(directory)
+                ))
+
+        return expired
+
+    def partitions(self):
+        """Returns sorted dates (as strings) of all partitions in the store."""
+        pattern = os.path.join(self.root, f"{self.partition_name}=*")
+        return sorted(_partition_date(path) for path in glob(pattern)
+                      if os.path.isdir(path))
+
+    # Reading ------------------------------------------------------------------
+
+    def read(self, columns: list = None, start=None, end=None,
+             filters: list = None):
+        """Reads the fragments of the store into a single DataFrame.
+
+        If a time window is given, partitions outside of it are skipped
+        entirely. Rows are filtered while scanning the remaining fragments,
+        which skips row groups whose statistics cannot match.
+
+        Parameters:
+            columns: Names of columns to read, all columns if None
+            start: Earliest (inclusive) query time to read, if any
+            end: Latest (inclusive) query time to read, if any
+            filters: Predicates that must all hold, as (column, op, value)
+                tuples, i.e. [("statistics.viewCount", ">=", 1_000_000)]
+        """
+        dataset = self.dataset(start, end)
+        if dataset is None:
+            return pd.DataFrame()
+
+        if columns is None:
+            columns = [name for name in dataset.schema.names
+                       if name != self.partition_name]
+
+        return to_pandas(dataset.to_table(
+            columns=columns, filter=self._filter(start, end, filters)
+        ))
+
+    def last(self, days: int = 30, columns: list = None, now=None):
+        """Reads only the last given number of days of the store.
+
+        Parameters:
+            days: Number of days to read
+            columns: Names of columns to read, all columns if None
+            now: End of the window, current UTC time if None
+        """
+        now = _to_utc(pd.Timestamp.now(tz="UTC") if now is None else now)
+        return self.read(columns, start=now - pd.Timedelta(days=days))
+
+    def dataset(self, start=None, end=None):
+        """Returns the store as a pyarrow Dataset, or None if it is empty.
+
+        Only fragments whose partition overlaps the given time window are
+        part of the dataset.
+
+        Fragments written at different times may hold different columns (e.g.
+        'liveStreamingDetails.*' only exists when a live video trended) or
+        different types for the same column (all-null, int vs. float). Their
+        schemas are unified, with known columns taking their typed schema
+        types, so that no column is lost on read.
+        """
+        fragments = self.fragments(start, end)
+        if not fragments:
+            return None
+
+        schema = pa.unify_schemas(
+            [conform_schema(pq.read_schema(path)) for path in fragments],
+            promote_options="permissive",
+        )
+        schema = schema.append(pa.field(self.partition_name, pa.string()))
+
+        return ds.dataset(
+            fragments,
+            schema=schema,
+            format="parquet",
+            partitioning=ds.partitioning(
+                pa.schema([(self.partition_name, pa.string())]), flavor="hive"
+            ),
+            partition_base_dir=self.root,
+        )
+
+    def fragments(self, start=None, end=None):
+        """Returns sorted paths of the fragments overlapping a time window.
+
+        Parameters:
+            start: Earliest (inclusive) query time, if any
+            end: Latest (inclusive) query time, if any
+        """
+        pattern = os.path.join(self.root, f"{self.partition_name}=*", "*.parquet")
+        paths = sorted(glob(pattern))
+
+        if start is not None:
+            first = _to_utc(start).strftime(self.partition_format)
+            paths = [path for path in paths if _partition_date(path) >= first]
+        if end is not None:
+            last = _to_utc(end).strftime(self.partition_format)
+            paths = [path for path in paths if _partition_date(path) <= last]
+
+        return paths
+
+    def partition_path(self, date: str):
+        """Returns the directory of the partition for the given date string."""
+        return os.path.join(self.root, f"{self.partition_name}={date}")
+
+    # Helpers ------------------------------------------------------------------
+
+    def _filter(self, start=None, end=None, filters: list = None):
+        """Returns a dataset filter expression for time window and predicates."""
+        expression = None
+        if filters:
+            expression = pq.filters_to_expression(filters)
+        if start is not None:
+            lower = ds.field(self.time_feature_name) >= _to_utc(start)
+            expression = lower if expression is None else expression & lower
+        if end is not None:
+            upper = ds.field(self.time_feature_name) <= _to_utc(end)
+            expression = upper if expression is None else expression & upper
+
+        return expression
+
+    def _write_fragment(self, table: pa.Table, path: str):
+        """Writes table to path atomically so readers never see partial files."""
+        tmp_path = path + ".tmp"
+        pq.write_table(table, tmp_path, compression=self.compression)
+        os.replace(tmp_path, path)
+
+
+def _to_utc(time):
+    """Returns given time (string, datetime, Timestamp) as a UTC Timestamp."""
+    time = pd.Timestamp(time)
+    if time.tz is None:
+        return time.tz_localize("UTC")
+    return time.tz_convert("UTC")
+
+
+def _partition_date(path: str):
+    """Returns the date string of the partition containing the given path."""
+    if path.endswith(".parquet"):
+        path = os.path.dirname(path)
+    return os.path.basename(path).split("=", 1)[1]
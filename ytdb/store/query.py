@@ -0,0 +1,106 @@
+"""Contains select, a column-projecting, predicate-pushing query function.
+
+Callers name columns with YouTubeAccessor aliases ("viewCount", "title",
+("thumbnails", "high", "url"), ...) and only those columns are read and
+decoded. Time ranges, category ids and simple numeric predicates are pushed
+down to the stores, so partitions and row groups that cannot match are
+skipped.
+"""
+
+import os
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from yt_utils import YouTubeAccessor, fetch
+
+from ytdb.store.partitioned import PartitionedStore, _to_utc
+from ytdb.store.remote import read_parquet
+from ytdb.store.schema import to_pandas
+from ytdb.store.video_store import VideoStore
+
+
+def select(source, columns: list = None, start=None, end=None,
+           category_ids: list = None, where: list = None,
+           time_feature_name: str = "queryTime"):
+    """Reads only the requested columns and rows of a snapshot source.
+
+    Parameters:
+        source: Path or URL of a .feather or .parquet file, root directory
+            of a PartitionedStore or VideoStore, or a store object
+        columns: YouTubeAccessor aliases or column names to read, all if None
+        start: Earliest (inclusive) query time to read, if any
+        end: Latest (inclusive) query time to read, if any
+        category_ids: Only read videos of these category ids, if given
+        where: Predicates that must all hold, as (alias, op, value) tuples,
+            i.e. [("viewCount", ">=", 5_000_000)]
+
+    Example:
+        select(path, ["id", "queryTime", "viewCount", "title"],
+               category_ids=[20], where=[("viewCount", ">=", 1_000_000)])
+    """
+    if columns is not None:
+        columns = list(dict.fromkeys(YouTubeAccessor.resolve(col) for col in columns))
+
+    filters = [(YouTubeAccessor.resolve(alias), op, value)
+               for alias, op, value in where or []]
+    if category_ids is not None:
+        filters.append((YouTubeAccessor.resolve("categoryId"), "in",
+                        [int(cat_id) for cat_id in category_ids]))
+
+    store = open_source(source)
+    if isinstance(store, (PartitionedStore, VideoStore)):
+        return store.read(columns, start, end, filters)
+
+    # Single file, only requested columns are decompressed
+    if start is not None:
+        filters.append((time_feature_name, ">=", _to_utc(start)))
+    if end is not None:
+        filters.append((time_feature_name, "<=", _to_utc(end)))
+
+    # Parquet is read by row group, remote files with Range requests
+    if store.endswith(".parquet"):
+        return read_parquet(store, columns, filters)
+
+    return _read_feather(store, columns, filters)
+
+
+def open_source(source):
+    """Returns the store at given source, or source itself if it is a file.
+
+    Parameters:
+        source: Path or URL of a .feather file, root directory of a
+            PartitionedStore or VideoStore, or a store object
+    """
+    if not isinstance(source, str) or not os.path.isdir(source):
+        return source
+
+    if os.path.exists(os.path.join(source, "videos.parquet")):
+        return VideoStore(source)
+
+    return PartitionedStore(source)
+
+
+def _read_feather(source: str, columns: list = None, filters: list = None):
+    """Reads columns of a .feather file (path or URL) and filters its rows."""
+    # Remote files go through the shared HTTP cache
+    source = pa.memory_map(fetch(source))
+
+    read_columns = None
+    if columns is not None:
+        # Filter columns are read too, but not returned
+        names = pa.ipc.open_file(source).schema.names
+        read_columns = [
+            col for col in dict.fromkeys(columns + [f[0] for f in filters or []])
+            if col in names
+        ]
+
+    table = feather.read_table(source, columns=read_columns)
+    if filters:
+        table = table.filter(pq.filters_to_expression(filters))
+
+    df = to_pandas(table)
+    if columns is not None:
+        df = df.loc[:, [col for col in columns if col in df.columns]]
+
+    return df
@@ -0,0 +1,202 @@
+"""Contains readers for Parquet files hosted online, using HTTP Range requests.
+
+The footer of a remote Parquet file is fetched first. Row groups whose
+statistics cannot match the query's predicates are skipped, and only the
+column chunks of the requested columns in the remaining row groups are
+downloaded, so remote reads scale with the query rather than with the file.
+The server has to support Range requests; if it answers with the whole file
+instead, that response is used as is.
+"""
+
+import io
+import http.client
+from urllib.parse import urlsplit
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ytdb.store.schema import to_pandas
+
+
+class HTTPRangeFile(io.RawIOBase):
+    """Seekable, read-only file over HTTP fetching byte ranges on demand.
+
+    A single keep-alive connection is reused for all requests.
+
+    Parameters:
+        url: Address of the remote file
+        footer_size: Number of trailing bytes fetched (and kept) on open
+    """
+
+    def __init__(self, url: str, footer_size: int = 64 * 1024):
+        self.url = url
+        self.requests = 0
+        self.bytes_read = 0
+
+        parts = urlsplit(url)
+        self._https = parts.scheme == "https"
+        self._host = parts.netloc
+        self._target = parts.path + (f"?{parts.query}" if parts.query else "")
+        self._connection = None
+
+        self._position = 0
+        self._full = None
+
+        # The footer is read first, its range response also gives the size
+        status, headers, data = self._get(f"bytes=-{footer_size}")
+        if status == 206:
+            self.size = int(headers["Content-Range"].rsplit("/", 1)[1])
+            self._tail = data
+            self._tail_start = self.size - len(data)
+        else:
+            self._full = data
+            self.size = len(data)
+
+    # io.RawIOBase ---------------------------------------------------------------
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = self.size + offset
+        return self._position
+
+    def readinto(self, buffer):
+        start = self._position
+        end = min(start + len(buffer), self.size)
+        if start >= end:
+            return 0
+
+        if self._full is not None:
+            data = self._full[start:end]
+        elif start >= self._tail_start:
+            data = self._tail[start - self._tail_start:end - self._tail_start]
+        else:
+            _, _, data = self._get(f"bytes={start}-{end - 1}")
+
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        super().close()
+
+    # Helpers ------------------------------------------------------------------
+
+    def _get(self, byte_range: str, retry: bool = True):
+        """Sends a ranged GET and returns (status, headers, body)."""
+        if self._connection is None:
+            cls = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+            self._connection = cls(self._host)
+
+        try:
+            self._connection.request("GET", self._target, headers={"Range": byte_range})
+            response = self._connection.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, ConnectionError):
+            # Server closed the kept-alive connection, reconnect once
+            self._connection.close()
+            self._connection = None
+            if not retry:
+                raise
+            return self._get(byte_range, retry=False)
+
+        if response.status not in (200, 206):
+            raise OSError(f"GET {self.url} ({byte_range}) failed: {response.status}")
+
+        self.requests += 1
+        self.bytes_read += len(data)
+
+        return response.status, response.headers, data
+
+
+def read_parquet(source: str, columns: list = None, filters: list = None):
+    """Reads columns and rows of a local or remote Parquet file.
+
+    Row groups are pruned with their statistics before any column chunk is
+    read. Remote files (http/https) are read with Range requests.
+
+    Parameters:
+        source: Path or URL of the Parquet file
+        columns: Names of columns to read, all columns if None
+        filters: Predicates that must all hold, as (column, op, value) tuples
+    """
+    remote = source.startswith(("http://", "https://"))
+    raw = HTTPRangeFile(source) if remote else None
+
+    try:
+        parquet = pq.ParquetFile(pa.PythonFile(raw, mode="r") if remote else source)
+        names = parquet.schema_arrow.names
+
+        row_groups = [
+            i for i in range(parquet.metadata.num_row_groups)
+            if _row_group_may_match(parquet.metadata.row_group(i), filters or [])
+        ]
+
+        read_columns = None
+        if columns is not None:
+            read_columns = [
+                col for col in dict.fromkeys(columns + [f[0] for f in filters or []])
+                if col in names
+            ]
+
+        table = parquet.read_row_groups(row_groups, columns=read_columns)
+    finally:
+        if raw is not None:
+            raw.close()
+
+    if filters:
+        table = table.filter(pq.filters_to_expression(filters))
+
+    df = to_pandas(table)
+    if columns is not None:
+        df = df.loc[:, [col for col in columns if col in df.columns]]
+
+    return df
+
+
+def _row_group_may_match(row_group, filters: list):
+    """Returns False if the row group statistics rule out any predicate."""
+    stats = {}
+    for i in range(row_group.num_columns):
+        column = row_group.column(i)
+        if column.statistics is not None and column.statistics.has_min_max:
+            stats[column.path_in_schema] = column.statistics
+
+    for name, op, value in filters:
+        if name not in stats:
+            continue
+        low, high = stats[name].min, stats[name].max
+
+        try:
+            if op in ("==", "=") and not low <= value <= high:
+                return False
+            if op == "in" and not any(low <= v <= high for v in value):
+                return False
+            if op == ">=" and high < value:
+                return False
+            if op == ">" and high <= value:
+                return False
+            if op == "<=" and low > value:
+                return False
+            if op == "<" and low >= value:
+                return False
+        except TypeError:
+            # Statistics not comparable with the value, cannot prune
+            continue
+
+    return True
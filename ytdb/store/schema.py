@@ -0,0 +1,190 @@
+"""Contains the typed Arrow schema of the YouTube snapshot stores.
+
+Snapshot columns are mostly strings that repeat on every hourly snapshot
+(channel, title, description, embed HTML, ...). These are stored
+dictionary-encoded, so that each distinct value is kept only once in memory
+and on disk, and load as pandas Categoricals. Integer, boolean and datetime
+columns match YouTubeReader.int_names, bool_names and dt_names.
+
+Only known columns are typed here, any other column keeps the type Arrow
+infers for it.
+"""
+
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+
+DICTIONARY = pa.dictionary(pa.int32(), pa.string())
+STRINGS = pa.list_(pa.string())
+TIMESTAMP = pa.timestamp("us", tz="UTC")
+
+# Thumbnails stay flattened (snippet.thumbnails.<size>.<key>) so that
+# YouTubeAccessor tuple aliases like ("thumbnails", "high", "url") still work
+_thumbnail_fields = []
+for _size in ("default", "medium", "high", "standard", "maxres"):
+    _thumbnail_fields += [
+        pa.field(f"snippet.thumbnails.{_size}.url", DICTIONARY),
+        pa.field(f"snippet.thumbnails.{_size}.width", pa.int32()),
+        pa.field(f"snippet.thumbnails.{_size}.height", pa.int32()),
+    ]
+
+SNAPSHOT_SCHEMA = pa.schema([
+    # Query
+    pa.field("queryTime", TIMESTAMP),
+    pa.field("kind", DICTIONARY),
+    pa.field("etag", pa.string()),
+    pa.field("id", DICTIONARY),
+    pa.field("source", DICTIONARY),
+
+    # Snippet
+    pa.field("snippet.publishedAt", TIMESTAMP),
+    pa.field("snippet.channelId", DICTIONARY),
+    pa.field("snippet.title", DICTIONARY),
+    pa.field("snippet.description", DICTIONARY),
+    pa.field("snippet.channelTitle", DICTIONARY),
+    pa.field("snippet.tags", STRINGS),
+    pa.field("snippet.categoryId", pa.int64()),
+    pa.field("snippet.liveBroadcastContent", DICTIONARY),
+    pa.field("snippet.localized.title", DICTIONARY),
+    pa.field("snippet.localized.description", DICTIONARY),
+    pa.field("snippet.defaultLanguage", DICTIONARY),
+    pa.field("snippet.defaultAudioLanguage", DICTIONARY),
+    *_thumbnail_fields,
+
+    # Content details
+    pa.field("contentDetails.duration", pa.string()),
+    pa.field("contentDetails.dimension", DICTIONARY),
+    pa.field("contentDetails.definition", DICTIONARY),
+    pa.field("contentDetails.caption", pa.bool_()),
+    pa.field("contentDetails.licensedContent", pa.bool_()),
+    pa.field("contentDetails.projection", DICTIONARY),
+    pa.field("contentDetails.regionRestriction.allowed", STRINGS),
+    pa.field("contentDetails.regionRestriction.blocked", STRINGS),
+
+    # Status
+    pa.field("status.uploadStatus", DICTIONARY),
+    pa.field("status.privacyStatus", DICTIONARY),
+    pa.field("status.license", DICTIONARY),
+    pa.field("status.embeddable", pa.bool_()),
+    pa.field("status.publicStatsViewable", pa.bool_()),
+    pa.field("status.madeForKids", pa.bool_()),
+
+    # Statistics
+    pa.field("statistics.viewCount", pa.int64()),
+    pa.field("statistics.likeCount", pa.int64()),
+    pa.field("statistics.favoriteCount", pa.int64()),
+    pa.field("statistics.commentCount", pa.int64()),
+
+    # Player, topics
+    pa.field("player.embedHtml", DICTIONARY),
+    pa.field("topicDetails.topicCategories", STRINGS),
+])
+
+
+def to_table(df: pd.DataFrame):
+    """Converts a snapshot DataFrame into a pyarrow Table of the typed schema.
+
+    Parameters:
+        df: DataFrame of flattened video entries
+    """
+    return cast_table(pa.Table.from_pandas(df, preserve_index=False))
+
+
+def cast_table(table: pa.Table):
+    """Casts all known columns of the given table to their schema types.
+
+    Parameters:
+        table: Table of flattened video entries
+    """
+    for i, field in enumerate(table.schema):
+        if field.name not in SNAPSHOT_SCHEMA.names:
+            continue
+
+        target = SNAPSHOT_SCHEMA.field(field.name)
+        if field.type != target.type:
+            table = table.set_column(i, target, _cast(table.column(i), target.type))
+
+    return table
+
+
+def to_pandas(table: pa.Table):
+    """Converts a table of snapshot entries into a DataFrame.
+
+    Integer columns of the schema read back as nullable Int64, also when the
+    table lost its pandas metadata (i.e. datasets of several fragments).
+
+    Parameters:
+        table: Table of flattened video entries
+    """
+    df = table.to_pandas()
+    for field in SNAPSHOT_SCHEMA:
+        if field.type == pa.int64() and field.name in df:
+            df[field.name] = df[field.name].astype("Int64")
+
+    return df
+
+
+def conform_schema(schema: pa.Schema):
+    """Returns given schema with the types of all known columns replaced.
+
+    Used to unify fragments written before (or without) the typed schema.
+
+    Parameters:
+        schema: Schema of a stored table or fragment
+    """
+    fields = [
+        SNAPSHOT_SCHEMA.field(field.name) if field.name in SNAPSHOT_SCHEMA.names else field
+        for field in schema
+    ]
+
+    return pa.schema(fields)
+
+
+def write_feather(df: pd.DataFrame, path: str):
+    """Writes a snapshot DataFrame to a zstd .feather file with typed schema.
+
+    Parameters:
+        df: DataFrame of flattened video entries
+        path: Path of the .feather file to write
+    """
+    table = to_table(df).unify_dictionaries()
+    feather.write_feather(table, path, compression="zstd")
+
+
+def write_parquet(df: pd.DataFrame, path: str, row_group_size: int = 10_000):
+    """Writes a snapshot DataFrame to a row-group-organized Parquet file.
+
+    Rows are clustered by category and query time, so that the row group
+    statistics let readers (i.e. over HTTP Range requests) skip every row
+    group of other categories or outside a time window.
+
+    Parameters:
+        df: DataFrame of flattened video entries
+        path: Path of the .parquet file to write
+        row_group_size: Maximum number of rows per row group
+    """
+    order = [col for col in ("snippet.categoryId", "queryTime") if col in df]
+    if order:
+        df = df.sort_values(order, kind="stable")
+
+    tmp_path = path + ".tmp"
+    pq.write_table(to_table(df), tmp_path, row_group_size=row_group_size,
+                   compression="zstd")
+    os.replace(tmp_path, path)
+
+
+def _cast(column: pa.ChunkedArray, target: pa.DataType):
+    """Casts column to target type, dictionary-encoding strings if needed."""
+    if pa.types.is_dictionary(target):
+        if pa.types.is_dictionary(column.type):
+            column = column.cast(column.type.value_type)
+        return column.cast(target.value_type).dictionary_encode()
+
+    if pa.types.is_dictionary(column.type):
+        column = column.cast(column.type.value_type)
+
+    return column.cast(target)
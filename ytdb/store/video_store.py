@@ -0,0 +1,269 @@
+"""Contains VideoStore, a dimension/fact layout of YouTube snapshots.
+
+Hourly snapshots repeat the full metadata (title, description, tags,
+thumbnails, embed HTML, topics, ...) of every video, although only its
+statistics change between snapshots. VideoStore keeps:
+
+    root/videos.parquet          video dimension, one row per video id
+    root/statistics/queryDate=*  narrow statistics facts, partitioned by date
+
+The dimension is only rewritten when a video is new or its metadata changed.
+Reading joins both back into the same wide view as a PartitionedStore, where
+every snapshot row carries the latest metadata of its video.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from ytdb.store.partitioned import PartitionedStore
+from ytdb.store.schema import to_pandas, to_table
+
+
+class VideoStore:
+    """Video dimension plus partitioned statistics facts of YouTube snapshots.
+
+    Parameters:
+        root: Directory holding the store (created on first append)
+        time_feature_name: Name of the time feature used for partitioning
+    """
+
+    key_name = "id"
+    hash_name = "metadataHash"
+
+    # Whether a fact row comes from a chart ("chart") or a statistics-only
+    # refresh ("refresh"), rows written before it existed are chart rows
+    source_name = "source"
+
+    # Features that change between snapshots, everything else is metadata
+    fact_names = (
+        "queryTime",
+        "etag",
+        source_name,
+    )
+    fact_prefixes = (
+        "statistics.",
+    )
+
+    def __init__(self, root: str, time_feature_name: str = "queryTime"):
+        self.root = root
+        self.time_feature_name = time_feature_name
+        self.statistics = PartitionedStore(
+            os.path.join(root, "statistics"), time_feature_name
+        )
+
+    # Writing ------------------------------------------------------------------
+
+    def append(self, df: pd.DataFrame):
+        """Appends statistics facts and upserts changed video metadata.
+
+        Parameters:
+            df: New snapshot rows in the wide (PartitionedStore) layout
+
+        Returns:
+            List of paths of the written fact fragments
+        """
+        if df.empty:
+            return []
+
+        facts = df[[self.key_name] + [col for col in df.columns if self.is_fact(col)]]
+        paths = self.statistics.append(facts.assign(**{self.source_name: "chart"}))
+
+        self._upsert_videos(df[[col for col in df.columns if not self.is_fact(col)]])
+
+        return paths
+
+    def append_statistics(self, df: pd.DataFrame):
+        """Appends statistics facts only, leaving the video dimension as is.
+
+        Used for statistics-only refreshes of videos already in the store,
+        i.e. videos.list(part="statistics") responses.
+
+        Parameters:
+            df: New rows holding the id and fact columns, others are ignored
+
+        Returns:
+            List of paths of the written fact fragments
+        """
+        if df.empty:
+            return []
+
+        facts = df[[self.key_name] + [col for col in df.columns if self.is_fact(col)]]
+        return self.statistics.append(facts.assign(**{self.source_name: "refresh"}))
+
+    def retain(self, days: int = 30, now=None, archive_root: str = None):
+        """Drops expired statistics partitions and videos no longer referenced.
+
+        Parameters:
+            days: Number of days of data to keep
+            now: End of the retention window, current UTC time if None
+            archive_root: If given, expired partitions are moved into this
+                directory instead of being deleted
+
+        Returns:
+            List of dates (as strings) of the removed partitions
+        """
+        expired = self.statistics.retain(days, now, archive_root)
+
+        if expired:
+            ids = self.statistics.read(columns=[self.key_name])[self.key_name]
+            videos = self.read_videos()
+            self._write_videos(videos[videos[self.key_name].isin(ids.unique())])
+
+        return expired
+
+    # Reading ------------------------------------------------------------------
+
+    def read(self, columns: list = None, start=None, end=None,
+             filters: list = None):
+        """Reads the wide view of statistics joined with video metadata.
+
+        Only the side of the join that holds requested columns is read, and
+        predicates are pushed down to the side holding their column.
+
+        Parameters:
+            columns: Names of columns to read, all columns if None
+            start: Earliest (inclusive) query time to read, if any
+            end: Latest (inclusive) query time to read, if any
+            filters: Predicates that must all hold, as (column, op, value)
+                tuples, i.e. [("snippet.categoryId", "in", [10, 20])]
+        """
+        filters = filters or []
+        fact_filters = [f for f in filters if self.is_fact(f[0])]
+        video_filters = [f for f in filters if not self.is_fact(f[0])]
+
+        fact_columns = None
+        video_columns = None
+        if columns is not None:
+            fact_columns = [self.key_name] + [col for col in columns if self.is_fact(col)]
+            video_columns = [self.key_name] + [
+                col for col in columns if not self.is_fact(col) and col != self.key_name
+            ]
+
+        facts = self.statistics.read(fact_columns, start, end, fact_filters)
+        if facts.empty:
+            return facts
+        if video_columns == [self.key_name] and not video_filters:
+            return facts.loc[:, columns]
+
+        videos = self.read_videos(video_columns, video_filters)
+        df = facts.merge(videos.drop(columns=self.hash_name, errors="ignore"),
+                         on=self.key_name, how="inner" if video_filters else "left",
+                         sort=False)
+
+        return df if columns is None else df.loc[:, columns]
+
+    def last(self, days: int = 30, columns: list = None, now=None):
+        """Reads only the last given number of days of the wide view.
+
+        Parameters:
+            days: Number of days to read
+            columns: Names of columns to read, all columns if None
+            now: End of the window, current UTC time if None
+        """
+        now = pd.Timestamp.now(tz="UTC") if now is None else pd.Timestamp(now)
+        return self.read(columns, start=now - pd.Timedelta(days=days))
+
+    def recent_ids(self, days: int = 30, now=None):
+        """Returns the ids of the videos charted in the last given days.
+
+        Only chart rows count, so statistics-only refreshes do not keep a
+        video recent once it left the charts.
+
+        Parameters:
+            days: Number of days to look back
+            now: End of the window, current UTC time if None
+        """
+        now = pd.Timestamp.now(tz="UTC") if now is None else pd.Timestamp(now)
+        start = now - pd.Timedelta(days=days)
+
+        dataset = self.statistics.dataset(start)
+        if dataset is None:
+            return []
+
+        columns = [self.key_name]
+        if self.source_name in dataset.schema.names:
+            columns.append(self.source_name)
+
+        facts = self.statistics.read(columns, start=start)
+        if self.source_name in facts:
+            facts = facts[facts[self.source_name] != "refresh"]
+
+        return facts[self.key_name].unique().tolist()
+
+    def read_videos(self, columns: list = None, filters: list = None):
+        """Reads the video dimension, one row with metadata per video id.
+
+        Parameters:
+            columns: Names of columns to read, all columns if None
+            filters: Predicates on metadata columns that must all hold
+        """
+        path = self.videos_path
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=[self.key_name, self.hash_name])
+
+        if columns is not None:
+            names = pq.read_schema(path).names
+            columns = [col for col in columns if col in names]
+
+        return to_pandas(pq.read_table(path, columns=columns, filters=filters or None))
+
+    @property
+    def videos_path(self):
+        return os.path.join(self.root, "videos.parquet")
+
+    @classmethod
+    def is_fact(cls, name: str):
+        """Returns whether the given column is stored in the statistics facts."""
+        return name in cls.fact_names or name.startswith(cls.fact_prefixes)
+
+    # Helpers ------------------------------------------------------------------
+
+    def _upsert_videos(self, new: pd.DataFrame):
+        """Inserts new videos and replaces those whose metadata changed."""
+        new = new.drop_duplicates(subset=self.key_name, keep="last")
+        new = new.assign(**{self.hash_name: _metadata_hash(new, self.key_name)})
+
+        videos = self.read_videos()
+        known = new[[self.key_name, self.hash_name]].merge(
+            videos[[self.key_name, self.hash_name]], how="left", indicator=True
+        )
+
+        changed = new[(known["_merge"] == "left_only").to_numpy()]
+        if changed.empty:
+            return
+
+        videos = videos[~videos[self.key_name].isin(changed[self.key_name])]
+        self._write_videos(pd.concat([videos, changed], ignore_index=True, sort=False))
+
+    def _write_videos(self, videos: pd.DataFrame):
+        """Rewrites the video dimension atomically."""
+        os.makedirs(self.root, exist_ok=True)
+
+        tmp_path = self.videos_path + ".tmp"
+        pq.write_table(to_table(videos), tmp_path,
+                       compression=PartitionedStore.compression)
+        os.replace(tmp_path, self.videos_path)
+
+
+def _metadata_hash(df: pd.DataFrame, key_name: str):
+    """Returns a hash of each row's non-null metadata.
+
+    Columns are combined order-independently and nulls do not contribute, so
+    the same video hashes the same whichever other videos (and hence columns)
+    came in the same response.
+    """
+    total = np.zeros(len(df), dtype="uint64")
+    for col in df.columns:
+        if col == key_name:
+            continue
+
+        values = df[col]
+        hashed = pd.util.hash_pandas_object(
+            col + "=" + values.astype(str), index=False
+        ).to_numpy()
+        total ^= np.where(values.isna().to_numpy(), 0, hashed).astype("uint64")
+
+    return total.astype("int64")
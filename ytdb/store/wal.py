@@ -0,0 +1,171 @@
+"""Contains ResponseLog, a write-ahead log of raw YouTube Data API responses.
+
+Every response is appended to the log before it is converted or stored, so
+a failed conversion or write loses no (quota-paid) response, and derived
+stores can be rebuilt from the log, i.e. after a schema change.
+
+Layout:
+    root/2022-09-14.wal    one segment per UTC day of query time
+    root/2022-09-15.wal
+    ...
+
+Every record is a length-prefixed, zstd-compressed orjson document:
+
+    <uint32 compressed size><uint32 size>  little-endian header
+    <zstd frame>                           {"meta": {...}, "response": {...}}
+
+Records are only ever appended. A record torn by a crash (a short header
+or frame at the end of a segment) is ignored by readers, and cut off by the
+next writer before it appends to the segment.
+"""
+
+import os
+import struct
+import threading
+from glob import glob
+
+import orjson
+import pyarrow as pa
+
+from ytdb.store.partitioned import _to_utc
+
+
+class ResponseLog:
+    """Append-only, day-segmented log of raw API responses.
+
+    Parameters:
+        root: Directory holding the segments (created on first append)
+        fsync: Whether every append is flushed to disk before returning
+    """
+
+    header = struct.Struct("<II")
+    codec = pa.Codec("zstd")
+    segment_format = "%Y-%m-%d"
+    suffix = ".wal"
+
+    def __init__(self, root: str, fsync: bool = True):
+        self.root = root
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._checked = set()
+
+    # Writing ------------------------------------------------------------------
+
+    def append(self, response: dict, query_time: str, **meta):
+        """Appends a response to the segment of its query time.
+
+        Parameters:
+            response: Raw API response as a dictionary
+            query_time: Query time of the response, i.e. YouTubeReader.time
+            meta: What the response is needed for to be replayed, i.e.
+                store="yt_trending", region="US"
+
+        Returns:
+            Path of the segment the response was appended to
+        """
+        meta = {"queryTime": query_time, **meta}
+        data = orjson.dumps({"meta": meta, "response": response})
+        frame = self.codec.compress(data, asbytes=True)
+
+        path = self.segment_path(_to_utc(query_time).strftime(self.segment_format))
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            if path not in self._checked:
+                self._truncate_torn(path)
+                self._checked.add(path)
+
+            with open(path, "ab") as f:
+                f.write(self.header.pack(len(frame), len(data)) + frame)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+        return path
+
+    # Reading ------------------------------------------------------------------
+
+    def records(self, start=None, end=None):
+        """Yields (meta, response) of every record in a time window, in order.
+
+        Only segments overlapping the window are read.
+
+        Parameters:
+            start: Earliest (inclusive) query time, if any
+            end: Latest (inclusive) query time, if any
+        """
+        for path in self.segments(start, end):
+            for meta, response in self.read_segment(path):
+                time = _to_utc(meta["queryTime"])
+                if start is not None and time < _to_utc(start):
+                    continue
+                if end is not None and time > _to_utc(end):
+                    continue
+                yield meta, response
+
+    @classmethod
+    def read_segment(cls, path: str):
+        """Yields (meta, response) of every complete record of a segment.
+
+        The segment is read sequentially in large buffered reads, and every
+        frame is decompressed into a buffer of its known size.
+        """
+        with open(path, "rb", buffering=1 << 20) as f:
+            while True:
+                header = f.read(cls.header.size)
+                if len(header) < cls.header.size:
+                    return
+
+                compressed_size, size = cls.header.unpack(header)
+                frame = f.read(compressed_size)
+                if len(frame) < compressed_size:
+                    return
+
+                record = orjson.loads(
+                    cls.codec.decompress(frame, decompressed_size=size, asbytes=True)
+                )
+                yield record["meta"], record["response"]
+
+    def segments(self, start=None, end=None):
+        """Returns sorted paths of the segments overlapping a time window.
+
+        Parameters:
+            start: Earliest (inclusive) query time, if any
+            end: Latest (inclusive) query time, if any
+        """
+        paths = sorted(glob(os.path.join(self.root, f"*{self.suffix}")))
+
+        if start is not None:
+            first = _to_utc(start).strftime(self.segment_format)
+            paths = [path for path in paths if self._segment_date(path) >= first]
+        if end is not None:
+            last = _to_utc(end).strftime(self.segment_format)
+            paths = [path for path in paths if self._segment_date(path) <= last]
+
+        return paths
+
+    def segment_path(self, date: str):
+        """Returns the path of the segment for the given date string."""
+        return os.path.join(self.root, date + self.suffix)
+
+    # Helpers ------------------------------------------------------------------
+
+    def _segment_date(self, path: str):
+        return os.path.basename(path)[:-len(self.suffix)]
+
+    def _truncate_torn(self, path: str):
+        """Cuts off a torn record at the end of a segment, reading headers only."""
+        if not os.path.exists(path):
+            return
+
+        size = os.path.getsize(path)
+        with open(path, "r+b") as f:
+            end = 0
+            while end + self.header.size <= size:
+                f.seek(end)
+                compressed_size, _ = self.header.unpack(f.read(self.header.size))
+                if end + self.header.size + compressed_size > size:
+                    break
+                end += self.header.size + compressed_size
+
+            if end < size:
+                f.truncate(end)
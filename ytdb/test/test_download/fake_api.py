@@ -0,0 +1,189 @@
+"""Local stand-in for the parts of the YouTube Data API the downloaders use.
+
+Serves videos.list (chart=mostPopular or by id) and videoCategories.list
+from the example responses in test_reader/example_data, with a configurable delay,
+categories without a chart, and a log of every request received.
+"""
+
+import copy
+import json
+import os
+import sys
+import threading
+import time
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+EXAMPLE = os.path.join(os.path.dirname(__file__), "..", "test_reader", "example_data", "trending1.json")
+DOWNLOAD = os.path.join(os.path.dirname(__file__), "..", "..", "download")
+
+
+def fake_client(tmp, api):
+    """Returns a YouTube Data API client of a FakeYouTubeAPI, None to skip.
+
+    None is returned (and the skip printed) if googleapiclient is not
+    installed. Otherwise the client is built with a fake key written to tmp,
+    and ytdb/download is put on sys.path for the downloader scripts.
+    """
+    try:
+        import googleapiclient  # noqa: F401
+    except ModuleNotFoundError:
+        print("googleapiclient is not installed, skipping")
+        return None
+
+    if DOWNLOAD not in sys.path:
+        sys.path.insert(0, DOWNLOAD)
+    from yt_utils import build_client
+
+    key_path = os.path.join(tmp, "api_key.txt")
+    with open(key_path, "w") as f:
+        f.write("fake-key")
+    return build_client(key_path, api_endpoint=api.endpoint)
+
+
+class FakeYouTubeAPI:
+    """Threaded HTTP server answering like the API, use as a context manager.
+
+    Parameters:
+        category_ids: Category ids listed by videoCategories.list
+        no_chart: Category ids whose chart answers 404, like the API does
+        delay: Seconds every videos.list request takes
+        pages: Pages of 50 videos in every chart, linked by nextPageToken
+
+    Charts carry an etag that changes when version is bumped, and requests
+    sending it back in If-None-Match are answered 304. Connections are kept
+    alive, and every connection opened is counted in connections.
+    """
+
+    def __init__(self, category_ids=range(1, 31), no_chart=(), delay=0.0, pages=1):
+        with open(EXAMPLE) as f:
+            self.example = json.load(f)
+
+        self.category_ids = [str(cat_id) for cat_id in category_ids]
+        self.no_chart = {str(cat_id) for cat_id in no_chart}
+        self.delay = delay
+        self.pages = pages
+        self.version = 0
+
+        self.requests = []
+        self.connections = 0
+        self.conditional = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_Handler, self))
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.server.server_port}/"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def chart(self, params):
+        """Example chart of the requested category, ids made unique per category."""
+        cat_id = params.get("videoCategoryId", [None])[0]
+        region = params.get("regionCode", ["US"])[0]
+        page = int(params.get("pageToken", ["page-0"])[0].split("-")[1])
+        response = copy.deepcopy(self.example)
+        response.pop("nextPageToken", None)
+        if page + 1 < self.pages:
+            response["nextPageToken"] = f"page-{page + 1}"
+
+        for item in response["items"]:
+            if cat_id is not None:
+                item["id"] = f"{item['id']}-{cat_id}"
+                item["snippet"]["categoryId"] = cat_id
+            if page:
+                item["id"] = f"{item['id']}-p{page}"
+        response["etag"] = f"chart-{region}-{cat_id}-{self.version}"
+        if page:
+            response["etag"] += f"-p{page}"
+        return response
+
+    def videos(self, params):
+        """Statistics of the requested ids, views growing with every request."""
+        ids = params["id"][0].split(",")
+        return {
+            "kind": "youtube#videoListResponse",
+            "items": [{
+                "kind": "youtube#video",
+                "etag": f"etag-{video_id}",
+                "id": video_id,
+                "statistics": {"viewCount": str(1000 * len(self.requests)), "likeCount": "10",
+                               "favoriteCount": "0", "commentCount": "1"},
+            } for video_id in ids],
+        }
+
+    def categories(self):
+        return {
+            "kind": "youtube#videoCategoryListResponse",
+            "items": [{"id": cat_id, "snippet": {"title": f"Category {cat_id}"}}
+                      for cat_id in self.category_ids],
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def __init__(self, api, *args, **kwargs):
+        self.api = api
+        super().__init__(*args, **kwargs)
+
+    def setup(self):
+        super().setup()
+        with self.api.lock:
+            self.api.connections += 1
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        endpoint = url.path.rstrip("/").rsplit("/", 1)[-1]
+
+        with self.api.lock:
+            self.api.requests.append((endpoint, params))
+            if self.headers.get("If-None-Match") is not None:
+                self.api.conditional += 1
+            self.api.in_flight += 1
+            self.api.max_in_flight = max(self.api.max_in_flight, self.api.in_flight)
+        try:
+            if endpoint == "videoCategories":
+                return self.send_json(200, self.api.categories())
+
+            time.sleep(self.api.delay)
+            if "id" in params:
+                return self.send_json(200, self.api.videos(params))
+            if params.get("videoCategoryId", [None])[0] in self.api.no_chart:
+                return self.send_json(404, {"error": {"code": 404, "message": "chart not found"}})
+
+            chart = self.api.chart(params)
+            if self.headers.get("If-None-Match") == chart["etag"]:
+                self.send_response(304)
+                self.send_header("ETag", chart["etag"])
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            return self.send_json(200, chart, etag=chart["etag"])
+        finally:
+            with self.api.lock:
+                self.api.in_flight -= 1
+
+    def send_json(self, status, body, etag=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
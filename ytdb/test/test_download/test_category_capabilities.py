@@ -0,0 +1,50 @@
+"""Checks that chartless categories and category ids are not requested every run.
+
+Run: python test_category_capabilities.py
+"""
+
+import tempfile
+from datetime import timedelta
+
+from yt_utils import CategoryCapabilities
+from ytdb.reader.reader import YouTubeReader
+
+from fake_api import FakeYouTubeAPI, fake_client
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp, FakeYouTubeAPI(no_chart={3, 4, 5}) as api:
+        youtube = fake_client(tmp, api)
+        if youtube is None:
+            return
+        import automate_download_data as download
+
+        output_path = tmp + "/"
+        state = output_path + "category_capabilities.json"
+
+        def run(ttl=timedelta(days=7)):
+            api.requests.clear()
+            capabilities = {"US": CategoryCapabilities(state, ttl=ttl)}
+            category_ids = download.get_category_ids(youtube, output_path, capabilities)
+            download.get_categories(youtube, YouTubeReader(), output_path, category_ids,
+                                    capabilities=capabilities)
+            return [params.get("videoCategoryId", [None])[0] for _, params in api.requests]
+
+        # First run probes everything
+        requested = run()
+        assert requested[0] is None and len(requested) == 31, requested
+        print("first run ok")
+
+        # Next run reuses ids and skips the 404s
+        requested = run()
+        assert sorted(requested, key=int) == [str(i) for i in range(1, 31) if i not in (3, 4, 5)]
+        print("cached run ok")
+
+        # Expired failures are probed again
+        requested = run(ttl=timedelta(0))
+        assert {"3", "4", "5"} <= set(requested), requested
+        print("reprobe ok")
+
+
+if __name__ == "__main__":
+    main()
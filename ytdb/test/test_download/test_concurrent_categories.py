@@ -0,0 +1,79 @@
+"""Checks concurrent category chart fetching against a local fake API.
+
+Run: python test_concurrent_categories.py
+"""
+
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from yt_utils import QuotaExceeded, QuotaLimiter
+from ytdb.reader.reader import YouTubeReader
+
+from fake_api import FakeYouTubeAPI, fake_client
+
+
+def main():
+    check_limiter()
+
+    check_get_categories()
+
+
+def check_limiter():
+    # Burst of capacity is immediate, the rest is paced at rate
+    limiter = QuotaLimiter(rate=100, capacity=10)
+    ts = time.perf_counter()
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(30)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - ts
+
+    assert limiter.used == 30
+    assert 0.15 <= seconds < 0.5, f"30 units at 100/s after a burst of 10 took {seconds:.2f}s"
+    print(f"limiter ok: 30 units in {seconds:.2f}s")
+
+    limiter = QuotaLimiter(rate=1000, capacity=10, budget=5)
+    for _ in range(5):
+        limiter.acquire()
+    try:
+        limiter.acquire()
+        raise AssertionError("budget not enforced")
+    except QuotaExceeded:
+        print("budget ok")
+
+
+def check_get_categories():
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeYouTubeAPI(no_chart={3, 4, 5}, delay=0.2) as api:
+        youtube = fake_client(tmp, api)
+        if youtube is None:
+            return
+        import automate_download_data as download
+
+
+        category_ids = [str(cat_id) for cat_id in range(1, 31)]
+        output_path = tmp + "/"
+
+        ts = time.perf_counter()
+        download.get_categories(youtube, YouTubeReader(), output_path, {"US": category_ids},
+                                limiter=QuotaLimiter(rate=1000), workers=10)
+        seconds = time.perf_counter() - ts
+
+        # 30 requests of 0.2s, 10 at a time
+        assert api.max_in_flight == 10, api.max_in_flight
+        assert seconds < 30 * 0.2 / 2, f"took {seconds:.2f}s"
+
+        # Charts of 27 categories merged into a single write, in category order
+        df = pd.read_feather(output_path + "yt_categories.feather")
+        expected = [cat_id for cat_id in category_ids if cat_id not in {"3", "4", "5"}]
+        assert df["snippet.categoryId"].astype(str).unique().tolist() == expected
+        assert len(df) == 27 * 50
+        print(f"get_categories ok: 30 charts in {seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
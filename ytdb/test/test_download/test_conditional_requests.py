@@ -0,0 +1,65 @@
+"""Checks that unchanged charts are requested conditionally and not stored again.
+
+Run: python test_conditional_requests.py
+"""
+
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+from yt_utils import ETagCache
+from ytdb.reader.reader import YouTubeReader
+
+from fake_api import FakeYouTubeAPI, fake_client
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp, FakeYouTubeAPI(category_ids=range(1, 6)) as api:
+        youtube = fake_client(tmp, api)
+        if youtube is None:
+            return
+        import automate_download_data as download
+
+        output_path = tmp + "/"
+        markers = output_path + "no_change.jsonl"
+        category_ids = ["1", "2", "3", "4", "5"]
+
+        def run():
+            etags = ETagCache(output_path + "etags.json", markers_path=markers)
+            reader = YouTubeReader()
+            download.get_trending(youtube, reader, output_path, etags=etags)
+            download.get_categories(youtube, reader, output_path, {"US": category_ids}, etags=etags)
+
+        def rows():
+            return (len(pd.read_feather(output_path + "yt_trending.feather")),
+                    len(pd.read_feather(output_path + "yt_categories.feather")))
+
+        # First run stores everything, unconditionally
+        run()
+        assert rows() == (50, 250) and api.conditional == 0
+        assert not os.path.exists(markers)
+        print("first run ok")
+
+        # Unchanged charts answer 304, nothing is stored, markers are logged
+        mtime = os.stat(output_path + "yt_categories.feather").st_mtime_ns
+        run()
+        assert api.conditional == 6
+        assert rows() == (50, 250)
+        assert os.stat(output_path + "yt_categories.feather").st_mtime_ns == mtime
+        with open(markers) as f:
+            logged = [json.loads(line) for line in f]
+        assert [m["videoCategoryId"] for m in logged] == [None, *category_ids]
+        assert all(m["status"] == "not_modified" for m in logged)
+        print("not modified run ok")
+
+        # Changed charts are stored again
+        api.version += 1
+        run()
+        assert rows() == (100, 500)
+        print("changed run ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Checks paginated chart requests against a local fake API.
+
+Run: python test_pagination.py
+"""
+
+import tempfile
+import time
+
+import pandas as pd
+
+from yt_utils import ETagCache, QuotaExceeded, QuotaLimiter, RequestPool, execute_all, execute_pages
+from ytdb.reader.reader import YouTubeReader
+from ytdb.store import PartitionedStore
+
+from fake_api import FakeYouTubeAPI, fake_client
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeYouTubeAPI(category_ids=range(1, 4), pages=4, delay=0.05) as api:
+        youtube = fake_client(tmp, api)
+        if youtube is None:
+            return
+        import automate_download_data as download
+
+        output_path = tmp + "/"
+        etags = ETagCache(output_path + "etags.json")
+
+        # Ranks 1-200 of every chart, in rank order
+        download.get_trending(youtube, YouTubeReader(), output_path, etags=etags, max_pages=4)
+        tokens = [params.get("pageToken", [None])[0] for _, params in api.requests]
+        assert tokens == [None, "page-1", "page-2", "page-3"], tokens
+        df = pd.read_feather(output_path + "yt_trending.feather")
+        assert len(df) == 200 and df["id"].is_unique
+        assert not df["id"][:50].str.contains("-p").any()
+        assert df["id"][50:100].str.endswith("-p1").all()
+        assert df["id"][150:].str.endswith("-p3").all()
+        print("trending pages ok")
+
+        download.get_categories(youtube, YouTubeReader(), output_path, {"US": ["1", "2", "3"]},
+                                limiter=QuotaLimiter(rate=1000), workers=3, max_pages=4)
+        df = pd.read_feather(output_path + "yt_categories.feather")
+        assert len(df) == 3 * 200
+        assert df["snippet.categoryId"].astype(str).unique().tolist() == ["1", "2", "3"]
+        print("category pages ok")
+
+        # A small buffer writes charts as they complete, in request order within a write
+        download.get_categories(youtube, YouTubeReader(), output_path, {"US": ["1", "2", "3"]},
+                                layout="partitioned", max_pages=4, buffer_rows=200)
+        store = PartitionedStore(output_path + "yt_categories")
+        assert len(store.fragments()) == 3
+        assert len(store.read(columns=["id"])) == 3 * 200
+        print("buffered writes ok")
+
+        # Only the first page is conditional, an unchanged chart costs one request
+        api.requests.clear()
+        api.conditional = 0
+        download.get_trending(youtube, YouTubeReader(), output_path, etags=etags, max_pages=4)
+        assert len(api.requests) == 1 and api.conditional == 1
+
+        api.version += 1
+        api.requests.clear()
+        api.conditional = 0
+        download.get_trending(youtube, YouTubeReader(), output_path, etags=etags, max_pages=4)
+        assert len(api.requests) == 4 and api.conditional == 1
+        assert len(pd.read_feather(output_path + "yt_trending.feather")) == 400
+        print("conditional pages ok")
+
+        # A spent budget stops the chain and is raised, the chart is not stored
+        api.version += 1
+        try:
+            download.get_trending(youtube, YouTubeReader(), output_path, etags=etags,
+                                  limiter=QuotaLimiter(rate=1000, budget=3), max_pages=4)
+            raise AssertionError("QuotaExceeded not raised")
+        except QuotaExceeded:
+            pass
+        assert len(pd.read_feather(output_path + "yt_trending.feather")) == 400
+        print("quota pages ok")
+
+        # A slow consumer holds back the workers, pages do not pile up
+        requests = {cat_id: youtube.videos().list(part="id", chart="mostPopular",
+                                                  maxResults=50, videoCategoryId=cat_id)
+                    for cat_id in ("1", "2", "3")}
+        api.requests.clear()
+        received = 0
+        for key, page in execute_pages(requests, youtube.videos().list_next, workers=2):
+            assert not isinstance(page, Exception), page
+            received += 1
+            time.sleep(0.1)
+            assert len(api.requests) <= received + 2 + 1, (received, len(api.requests))
+        assert received == 3 * 4
+        print("bounded pages ok")
+
+        # Stopping early releases the workers
+        pages = execute_pages(requests, youtube.videos().list_next, workers=3)
+        next(pages)
+        pages.close()
+        print("early stop ok")
+
+        # A shared pool keeps one connection per worker across calls
+        api.connections = 0
+        with RequestPool(2) as pool:
+            for _ in range(3):
+                assert len(list(execute_pages(requests, youtube.videos().list_next,
+                                              pool=pool))) == 3 * 4
+                responses = execute_all(requests, pool=pool)
+                assert not any(isinstance(r, Exception) for r in responses.values())
+        assert api.connections <= 2, api.connections
+        print(f"shared pool ok: {api.connections} connections")
+
+
+if __name__ == "__main__":
+    main()
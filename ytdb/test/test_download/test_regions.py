@@ -0,0 +1,88 @@
+"""Checks multi-region collection against a local fake API.
+
+Run: python test_regions.py
+"""
+
+import os
+import tempfile
+import time
+
+from yt_utils import CategoryCapabilities, QuotaLimiter, region_path
+from ytdb.reader.reader import YouTubeReader
+from ytdb.store import PartitionedStore, select
+
+from fake_api import FakeYouTubeAPI, fake_client
+
+REGIONS = ["US", "GB", "DE", "FR", "JP", "BR"]
+
+
+def main():
+    check_region_path()
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeYouTubeAPI(category_ids=range(1, 4), delay=0.2) as api:
+        youtube = fake_client(tmp, api)
+        if youtube is None:
+            return
+        import automate_download_data as download
+
+        output_path = tmp + "/"
+        limiter = QuotaLimiter(rate=1000)
+        reader = YouTubeReader()
+
+        # Charts of all regions are in flight together
+        ts = time.perf_counter()
+        download.get_trending(youtube, reader, output_path, layout="partitioned",
+                              regions=REGIONS, limiter=limiter, workers=12)
+        seconds = time.perf_counter() - ts
+        assert api.max_in_flight == len(REGIONS), api.max_in_flight
+        assert seconds < len(REGIONS) * 0.2, f"took {seconds:.2f}s"
+        print(f"trending ok: {len(REGIONS)} regions in {seconds:.2f}s")
+
+        capabilities = {
+            region: CategoryCapabilities(
+                download._region_path(output_path, "category_capabilities.json", region)
+            )
+            for region in REGIONS
+        }
+        category_ids = download.get_category_ids(youtube, output_path, capabilities,
+                                                 regions=REGIONS, limiter=limiter)
+        assert list(category_ids) == REGIONS
+        assert os.path.exists(output_path + "regionCode=GB/video_categories.json")
+
+        api.requests.clear()
+        download.get_categories(youtube, reader, output_path, category_ids,
+                                layout="partitioned", limiter=limiter, workers=12,
+                                capabilities=capabilities)
+
+        # One request per region and category, each with its own region code
+        sent = sorted((params["regionCode"][0], params["videoCategoryId"][0])
+                      for _, params in api.requests)
+        assert sent == sorted((region, str(cat_id)) for region in REGIONS
+                              for cat_id in range(1, 4)), sent
+        print("categories ok")
+
+        # The default region keeps the unpartitioned paths, others have their own
+        for region in REGIONS:
+            root = region_path(output_path + "yt_categories", region)
+            fragments = PartitionedStore(root).fragments()
+            assert len(fragments) == 1, (region, fragments)
+            assert all(path.startswith(root + os.sep) for path in fragments)
+            assert len(select(root, ["id", "categoryId"])) == 150
+        assert not any(name.startswith("regionCode=")
+                       for name in os.listdir(output_path + "yt_categories"))
+        print("region partitions ok")
+
+
+def check_region_path():
+    assert region_path("database/yt_trending.feather") == "database/yt_trending.feather"
+    assert region_path("database/yt_trending.feather", "GB") == \
+        "database/regionCode=GB/yt_trending.feather"
+    assert region_path("https://host/static/yt_categories.feather", "JP") == \
+        "https://host/static/regionCode=JP/yt_categories.feather"
+    assert region_path("yt_trending", "DE") == "regionCode=DE/yt_trending"
+    print("region_path ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Checks that stores rebuilt from the response log match the downloaded ones.
+
+Run: python test_replay.py
+"""
+
+import os
+import tempfile
+
+import pandas as pd
+
+from ytdb.reader.reader import YouTubeReader
+from ytdb.store import ResponseLog, VideoStore
+
+from fake_api import FakeYouTubeAPI, fake_client
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeYouTubeAPI(category_ids=range(1, 4), pages=2) as api:
+        youtube = fake_client(tmp, api)
+        if youtube is None:
+            return
+        import automate_download_data as download
+        import replay_log
+
+        output_path = tmp + "/database/"
+        log = ResponseLog(output_path + "responses", fsync=False)
+
+        # Two runs of both charts in two regions, then a statistics refresh
+        for hour in ("10", "11"):
+            reader = YouTubeReader(time=f"2022-09-14T{hour}:00:00Z")
+            download.get_trending(youtube, reader, output_path, layout="split",
+                                  regions=["US", "GB"], max_pages=2, log=log)
+            download.get_categories(youtube, reader, output_path,
+                                    {"US": ["1", "2", "3"], "GB": ["1", "2"]},
+                                    layout="split", max_pages=2, log=log)
+        download.refresh_statistics(youtube, output_path, days=100000,
+                                    regions=["US", "GB"], log=log)
+        print("downloads ok")
+
+        # Split stores are rebuilt to the same rows, statistics refreshes included
+        replayed = tmp + "/replayed/"
+        replay_log.replay(output_path + "responses", replayed, layout="split", workers=2)
+        for name in ("yt_trending", "yt_categories"):
+            for region in ("", "regionCode=GB/"):
+                expected = _sorted(VideoStore(output_path + region + name).read())
+                actual = _sorted(VideoStore(replayed + region + name).read())
+                pd.testing.assert_frame_equal(actual, expected, check_like=True,
+                                              check_categorical=False)
+        print("split replay ok")
+
+        # A failed conversion loses no response
+        reader = YouTubeReader(time="2022-09-14T12:00:00Z")
+        reader.videos_to_df = None
+        try:
+            download.get_trending(youtube, reader, output_path, layout="split",
+                                  max_pages=2, log=log)
+        except TypeError:
+            pass
+        assert sum(1 for _ in log.records("2022-09-14T12:00:00Z", "2022-09-14T12:00:00Z")) == 1
+        print("failed conversion logged ok")
+
+        # Only the requested store and region
+        replay_log.replay(output_path + "responses", tmp + "/feather/", stores=["yt_categories"],
+                          regions=["GB"], end="2022-09-14T11:59:59Z")
+        assert os.listdir(tmp + "/feather/") == ["regionCode=GB"]
+        df = pd.read_feather(tmp + "/feather/regionCode=GB/yt_categories.feather")
+        assert len(df) == 2 * 2 * 2 * 50
+        print("feather replay ok")
+
+
+def _sorted(df):
+    df = df.assign(id=df["id"].astype(str))
+    return df.sort_values(["queryTime", "id"]).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    main()
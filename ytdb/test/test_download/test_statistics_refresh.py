@@ -0,0 +1,77 @@
+"""Checks the statistics-only refresh against a local fake API.
+
+Run: python test_statistics_refresh.py
+"""
+
+import json
+import os
+import tempfile
+
+from ytdb.reader.reader import YouTubeReader
+from ytdb.store import VideoStore
+
+from fake_api import EXAMPLE, FakeYouTubeAPI, fake_client
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp, FakeYouTubeAPI(category_ids=range(1, 4)) as api:
+        youtube = fake_client(tmp, api)
+        if youtube is None:
+            return
+        import automate_download_data as download
+
+        output_path = tmp + "/"
+
+        # Seed the split stores with 150 category videos and 50 trending ones
+        download.get_categories(youtube, YouTubeReader(), output_path, {"US": ["1", "2", "3"]}, layout="split")
+        download.get_trending(youtube, YouTubeReader(), output_path, layout="split")
+        categories = VideoStore(output_path + "yt_categories")
+        trending = VideoStore(output_path + "yt_trending")
+        videos_before = os.stat(categories.videos_path).st_mtime_ns
+
+        api.requests.clear()
+        download.refresh_statistics(youtube, output_path, days=7)
+
+        # 200 distinct videos, 50 ids per request, statistics part only
+        assert len(api.requests) == 4, len(api.requests)
+        for _, params in api.requests:
+            assert len(params["id"][0].split(",")) == 50
+            assert params["part"] == ["id,statistics"]
+
+        # Every video got a second fact row in the store it was seen in
+        facts = categories.statistics.read(columns=["id", "statistics.viewCount"])
+        assert len(facts) == 300 and facts["id"].value_counts().eq(2).all()
+        assert len(trending.statistics.read(columns=["id"])) == 100
+
+        # Refreshed rows still join to their metadata
+        df = categories.read(columns=["id", "queryTime", "snippet.title", "statistics.viewCount"])
+        assert df["snippet.title"].notna().all()
+        assert os.stat(categories.videos_path).st_mtime_ns == videos_before
+        print("statistics refresh ok")
+
+    # Refreshes alone do not keep a video recent once it left the charts
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VideoStore(tmp + "/yt_trending")
+        store.append(_frame("2022-09-01T10:00:00Z", ["a", "b"]))
+        for day in range(2, 12):
+            time = f"2022-09-{day:02}T10:00:00Z"
+            store.append_statistics(_frame(time, ["a", "b"]))
+            if day == 5:
+                store.append(_frame(time, ["b"]))
+
+        assert sorted(store.recent_ids(7, now="2022-09-07T12:00:00Z")) == ["a", "b"]
+        assert store.recent_ids(7, now="2022-09-11T12:00:00Z") == ["b"]
+        assert store.recent_ids(7, now="2022-09-13T12:00:00Z") == []
+        print("recent ids ok")
+
+
+def _frame(time, ids):
+    """Returns a snapshot DataFrame of example videos with the given ids."""
+    with open(EXAMPLE) as f:
+        response = json.load(f)
+    response["items"] = [dict(item, id=video_id) for item, video_id in zip(response["items"], ids)]
+    return YouTubeReader.convert_datetimes(YouTubeReader(time=time).videos_to_df(response))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Runs the ETL end to end on local snapshot files.
+
+Run: python test_pipeline.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from yt_utils import load_config
+from ytdb.reader.reader import YouTubeReader
+
+ETL = os.path.join(os.path.dirname(__file__), "..", "..", "..", "etl")
+EXAMPLE = os.path.join(os.path.dirname(__file__), "..", "test_reader", "example_data", "trending1.json")
+
+
+class CountingHandler(SimpleHTTPRequestHandler):
+    """Static file handler recording every requested path."""
+
+    requests = []
+
+    def send_head(self):
+        CountingHandler.requests.append(self.path)
+        return super().send_head()
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    try:
+        import nltk  # noqa: F401
+    except ModuleNotFoundError:
+        print("nltk is not installed, skipping")
+        return
+
+    sys.path.insert(0, os.path.abspath(ETL))
+    import main as etl
+
+    with open(EXAMPLE) as f:
+        response = json.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Local copies of the published files, named by the config
+        categories_path = os.path.join(tmp, "yt_categories.feather")
+        YouTubeReader().insert_videos(response, categories_path)
+        ids_path = os.path.join(tmp, "video_categories.json")
+        category_ids = sorted({item["snippet"]["categoryId"] for item in response["items"]})
+        with open(ids_path, "w") as f:
+            json.dump({"items": [{"id": cat_id, "snippet": {"title": f"Category {cat_id}"}}
+                                 for cat_id in category_ids]}, f)
+
+        df = _run(etl, tmp, {"TRENDING": categories_path, "CATEGORIES": categories_path,
+                             "CATEGORY_IDS": ids_path})
+        assert not df.empty
+        print(f"pipeline ok: {len(df)} rows of cat_tags_hist")
+
+        # Remote inputs are downloaded once, the task loads the fetched copy
+        server = ThreadingHTTPServer(("127.0.0.1", 0), partial(CountingHandler, directory=tmp))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        os.environ["MRB_CACHE_DIR"] = os.path.join(tmp, "cache")
+        try:
+            ids_url = f"http://127.0.0.1:{server.server_port}/video_categories.json"
+            df = _run(etl, tmp, {"TRENDING": categories_path, "CATEGORIES": categories_path,
+                                 "CATEGORY_IDS": ids_url})
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert not df.empty
+        assert CountingHandler.requests == ["/video_categories.json"], CountingHandler.requests
+        print("remote input ok: fetched once")
+
+
+def _run(etl, tmp, paths):
+    """Runs the ETL on the given paths, returns the cat_tags_hist output."""
+    with open(os.path.join(tmp, "config.yaml"), "w") as f:
+        json.dump({"PATHS": paths, "LOCAL": True}, f)
+    load_config.cache_clear()
+
+    # The ETL runs from etl/, with the config one level up
+    workdir = os.path.join(tmp, "etl")
+    os.makedirs(workdir, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        etl.main()
+        return pd.read_feather("data/cat_tags_hist.feather")
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Checks df.yt.duration_seconds against the single-value parser.
+
+Run: python test_duration_seconds.py
+"""
+
+import pandas as pd
+
+from yt_utils import YouTubeAccessor
+
+
+def main():
+    durations = ["PT4M13S", "PT1H2M", "P1DT30S", "P2W", "PT45S", "PT4M13S"]
+    df = pd.DataFrame({"contentDetails.duration": durations})
+    seconds = df.yt.duration_seconds()
+    assert seconds.dtype == "int64"
+    assert seconds.tolist() == [YouTubeAccessor.convert_pt_to_seconds(d) for d in durations]
+    print("durations ok")
+
+    # Missing and invalid durations are NA, the others still parsed
+    df = pd.DataFrame({"contentDetails.duration": [None, "PT1M", "1:30", "PT2S"]})
+    seconds = df.yt.duration_seconds()
+    assert seconds.dtype == "Int64"
+    assert seconds.isna().tolist() == [True, False, True, False]
+    assert seconds.dropna().tolist() == [60, 2]
+    print("missing durations ok")
+
+    # Nothing to parse
+    for values in ([], [None, None], [pd.NA]):
+        df = pd.DataFrame({"contentDetails.duration": pd.Series(values, dtype=object)})
+        seconds = df.yt.duration_seconds()
+        assert seconds.dtype == "Int64" and len(seconds) == len(values)
+        assert seconds.isna().all()
+    print("empty and all-null durations ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Checks yt_utils.HTTPCache against a local http.server stand-in.
+
+Run: python test_fetch_cache.py
+"""
+
+import os
+import tempfile
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from yt_utils import HTTPCache
+
+
+class ETagHandler(SimpleHTTPRequestHandler):
+    """Static file handler that also answers If-None-Match with 304."""
+
+    requests = []
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        etag = f'"{os.stat(path).st_mtime_ns}"' if os.path.exists(path) else None
+        ETagHandler.requests.append((self.path, self.headers.get("If-None-Match")))
+
+        if etag is not None and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return None
+
+        self._etag = etag
+        return super().send_head()
+
+    def end_headers(self):
+        if getattr(self, "_etag", None):
+            self.send_header("ETag", self._etag)
+        super().end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    with tempfile.TemporaryDirectory() as served, tempfile.TemporaryDirectory() as cache_dir:
+        server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), partial(ETagHandler, directory=served)
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+
+        write(served, "a.feather", b"a" * 100)
+        write(served, "b.feather", b"b" * 100)
+        cache = HTTPCache(cache_dir, max_bytes=150)
+
+        # First fetch downloads, second one only revalidates
+        path = cache.fetch(f"{base}/a.feather")
+        assert read(path) == b"a" * 100
+        assert cache.fetch(f"{base}/a.feather") == path
+        assert ETagHandler.requests[-1][1] is not None, "no conditional request"
+        print("revalidation ok")
+
+        # Changed file is downloaded again
+        write(served, "a.feather", b"A" * 100)
+        os.utime(os.path.join(served, "a.feather"), ns=(1, 1))
+        assert read(cache.fetch(f"{base}/a.feather")) == b"A" * 100
+        print("refresh ok")
+
+        # Size bound evicts the least recently used file
+        cache.fetch(f"{base}/b.feather")
+        assert not os.path.exists(path), "a.feather not evicted"
+        assert os.path.exists(cache.path(f"{base}/b.feather"))
+        print("eviction ok")
+
+        # Cached .json files are evicted too, only their metadata is not counted
+        write(served, "c.json", b"c" * 100)
+        json_path = cache.fetch(f"{base}/c.json")
+        cache.fetch(f"{base}/b.feather")
+        assert not os.path.exists(json_path), "c.json not evicted"
+        assert not os.path.exists(json_path + HTTPCache.meta_suffix)
+        print("json eviction ok")
+
+        # Offline, the cached copy is served
+        server.shutdown()
+        server.server_close()
+        assert read(cache.fetch(f"{base}/b.feather")) == b"b" * 100
+        print("offline ok")
+
+
+def write(directory, name, data):
+    with open(os.path.join(directory, name), "wb") as file:
+        file.write(data)
+
+
+def read(path):
+    with open(path, "rb") as file:
+        return file.read()
+
+
+if __name__ == "__main__":
+    main()
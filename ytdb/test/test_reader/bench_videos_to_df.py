@@ -0,0 +1,76 @@
+"""Micro-benchmark of YouTubeReader.responses_to_df against per-item flattening.
+
+Run from this directory: python bench_videos_to_df.py
+"""
+
+import json
+import time
+
+import pandas as pd
+
+from ytdb.reader.reader import YouTubeReader
+
+
+def main():
+    with open("example_data/trending1.json") as file:
+        t1 = json.load(file)
+    with open("example_data/trending2.json") as file:
+        t2 = json.load(file)
+
+    # Roughly one run of get_categories (~15 charts of 50 videos)
+    responses = [t1, t2] * 8
+    n_rows = sum(len(data["items"]) for data in responses)
+
+    yt_reader = YouTubeReader()
+
+    per_item = bench(lambda: pd.concat(
+        [per_item_videos_to_df(yt_reader, data) for data in responses],
+        ignore_index=True, sort=False,
+    ))
+    batched = bench(lambda: yt_reader.responses_to_df(responses))
+
+    print(f"rows per run: {n_rows}")
+    print(f"per-item: {n_rows / per_item:12,.0f} rows/sec")
+    print(f"batched:  {n_rows / batched:12,.0f} rows/sec")
+    print(f"speedup:  {per_item / batched:12.1f}x")
+
+
+def bench(fn, repeat: int = 5):
+    """Returns the best wall time in seconds of several calls of fn."""
+    best = float("inf")
+    for _ in range(repeat):
+        ts = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - ts)
+    return best
+
+
+def per_item_videos_to_df(yt_reader, data):
+    """Previous videos_to_df, flattening and encoding every video separately."""
+    entries = []
+    for item in data["items"]:
+        item = list(pd.json_normalize(item).T.to_dict().values())[0]
+
+        entry = {"queryTime": yt_reader.time}
+        entry.update(item)
+
+        for int_name in YouTubeReader.int_names:
+            try:
+                entry[int_name] = int(entry[int_name])
+            except (KeyError, ValueError):
+                pass
+
+        for bool_name in YouTubeReader.bool_names:
+            try:
+                if isinstance(entry[bool_name], str):
+                    entry[bool_name] = bool(entry[bool_name])
+            except (KeyError, ValueError):
+                pass
+
+        entries.append(entry)
+
+    return pd.DataFrame(entries)
+
+
+if __name__ == "__main__":
+    main()
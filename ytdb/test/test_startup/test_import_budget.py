@@ -0,0 +1,136 @@
+"""Imports every entry point offline and checks its startup time.
+
+Each entry point is imported in a fresh interpreter with outgoing
+connections refused, so any network call made at import time fails the
+check instead of slowing startup down. The dashboard is also started and
+must accept connections within its bind budget.
+
+Run: python test_import_budget.py
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+# (working directory, module, import budget in seconds)
+ENTRY_POINTS = [
+    ("dash_app", "index", 3.0),
+    ("etl", "main", 2.0),
+    ("ytdb/download", "automate_download_data", 2.0),
+    ("mysql", "automate_download_data", 2.0),
+    ("models/diffusion", "get_images", 10.0),
+    ("models/diffusion", "starting", 10.0),
+]
+
+BIND_BUDGET = 1.0
+
+# Refuses connections, recording those blocking the import (background
+# warm-up threads may try and fail), then imports the module
+OFFLINE_IMPORT = """
+import json, socket, sys, threading, time
+
+attempts = []
+def refuse(self, address, *args):
+    if threading.current_thread() is threading.main_thread():
+        attempts.append(repr(address))
+    raise OSError("network disabled during import")
+socket.socket.connect = refuse
+socket.socket.connect_ex = refuse
+
+ts = time.perf_counter()
+try:
+    __import__(sys.argv[1])
+except ModuleNotFoundError as e:
+    print(json.dumps({"missing": e.name}))
+    sys.exit(0)
+seconds = time.perf_counter() - ts
+print(json.dumps({"seconds": seconds, "connects": attempts}))
+"""
+
+# Prints when imports are done, then serves
+SERVE = """
+import sys, time
+import index
+print(time.time(), flush=True)
+index.app.run(port=int(sys.argv[1]), debug=False)
+"""
+
+
+def import_offline(cwd, module):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run(
+        [sys.executable, "-c", OFFLINE_IMPORT, module],
+        cwd=os.path.join(ROOT, cwd), env=env, capture_output=True, text=True, timeout=120,
+    )
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1]}
+
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def bind_time():
+    """Seconds from the dashboard's imports being done to its port accepting connections."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    server = subprocess.Popen([sys.executable, "-c", SERVE, str(port)], cwd=os.path.join(ROOT, "dash_app"),
+                              env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        imported = float(server.stdout.readline())
+        while server.poll() is None and time.time() - imported < 60:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                return time.time() - imported
+            except OSError:
+                time.sleep(0.01)
+        return None
+    finally:
+        server.kill()
+        server.wait()
+
+
+def main():
+    failures = []
+
+    for cwd, module, budget in ENTRY_POINTS:
+        name = f"{cwd}/{module}"
+        result = import_offline(cwd, module)
+
+        if "missing" in result:
+            print(f"SKIP {name}: {result['missing']} is not installed")
+        elif "error" in result:
+            failures.append(name)
+            print(f"FAIL {name}: {result['error']}")
+        elif result["connects"]:
+            failures.append(name)
+            print(f"FAIL {name}: connects at import to {', '.join(result['connects'])}")
+        elif result["seconds"] > budget:
+            failures.append(name)
+            print(f"FAIL {name}: imported in {result['seconds']:.2f}s, budget {budget}s")
+        else:
+            print(f"OK   {name}: imported in {result['seconds']:.2f}s, budget {budget}s")
+
+    dashboard = import_offline("dash_app", "index")
+    if "missing" in dashboard or "error" in dashboard:
+        print("SKIP dashboard bind: dashboard does not import")
+    else:
+        seconds = bind_time()
+        if seconds is None or seconds > BIND_BUDGET:
+            failures.append("dashboard bind")
+            print(f"FAIL dashboard bind: {'never listening' if seconds is None else f'{seconds:.2f}s'}, budget {BIND_BUDGET}s")
+        else:
+            print(f"OK   dashboard bind: listening {seconds:.2f}s after imports, budget {BIND_BUDGET}s")
+
+    assert not failures, f"Startup budget exceeded: {', '.join(failures)}"
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Checks that ytdb.store.load_mapped keeps every column a view of the mapping.
+
+Run from this directory: python test_mapped.py
+"""
+
+import json
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+
+from ytdb.reader.reader import YouTubeReader
+from ytdb.store import load_mapped, write_feather
+
+EXAMPLE = os.path.join(os.path.dirname(__file__), "..", "test_reader", "example_data", "trending1.json")
+
+# The columns the dashboard loads
+COLUMNS = ["id", "queryTime", "title", "categoryId", "viewCount", "duration", "tags"]
+
+
+def main():
+    with open(EXAMPLE) as f:
+        response = json.load(f)
+
+    frames = [YouTubeReader(time=f"2022-09-14T{hour:02}:00:00Z").videos_to_df(response)
+              for hour in range(24)]
+    df = YouTubeReader.convert_datetimes(pd.concat(frames, ignore_index=True))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "yt_trending.feather")
+        write_feather(df, source)
+
+        # Built once, then only mapped
+        load_mapped(source, COLUMNS, tmp)
+        allocated = pa.total_allocated_bytes()
+        mapped = load_mapped(source, COLUMNS, tmp)
+        copied = pa.total_allocated_bytes() - allocated
+
+        assert len(mapped) == len(df)
+        assert all(isinstance(dtype, pd.ArrowDtype) for dtype in mapped.dtypes), mapped.dtypes
+        # Only bookkeeping is allocated, no column data
+        assert copied < 1024, f"{copied} bytes copied"
+        assert mapped.yt["title"].tolist() == df.yt["title"].astype(str).tolist()
+        print(f"zero-copy ok: {len(mapped.columns)} columns mapped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Checks ytdb.store.read_parquet against a local Range-capable http.server.
+
+Run from this directory: python test_remote_parquet.py
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from ytdb.reader.reader import YouTubeReader
+from ytdb.store import read_parquet, write_parquet
+import ytdb.store.remote as remote
+
+
+class RangeHandler(SimpleHTTPRequestHandler):
+    """Static file handler answering single byte Range requests with 206."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range", ""))
+        if match is None:
+            return super().do_GET()
+
+        with open(self.translate_path(self.path), "rb") as file:
+            data = file.read()
+
+        first, last = match.groups()
+        if first == "":
+            first, last = max(len(data) - int(last), 0), len(data) - 1
+        else:
+            first, last = int(first), min(int(last or len(data) - 1), len(data) - 1)
+
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {first}-{last}/{len(data)}")
+        self.send_header("Content-Length", str(last - first + 1))
+        self.end_headers()
+        self.wfile.write(data[first:last + 1])
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    with open("../test_reader/example_data/trending1.json") as file:
+        t1 = json.load(file)
+
+    # 48 snapshots of the same 50 videos
+    frames = []
+    for hour in range(48):
+        yt_reader = YouTubeReader(time=f"2022-09-{14 + hour // 24}T{hour % 24:02d}:00:00Z")
+        frames.append(yt_reader.videos_to_df(t1))
+    df = YouTubeReader.convert_datetimes(pd.concat(frames, ignore_index=True))
+
+    with tempfile.TemporaryDirectory() as served:
+        path = os.path.join(served, "yt_trending.parquet")
+        write_parquet(df, path, row_group_size=200)
+
+        server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), partial(RangeHandler, directory=served)
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/yt_trending.parquet"
+
+        columns = ["id", "queryTime", "statistics.viewCount", "statistics.likeCount"]
+        filters = [("snippet.categoryId", "==", 20)]
+
+        remote = read_parquet(url, columns, filters)
+        local = read_parquet(path, columns, filters)
+        expected = df[df["snippet.categoryId"] == 20]
+        assert len(remote) == len(local) == len(expected), (len(remote), len(expected))
+        print(f"rows ok: {len(remote)}")
+
+        # Hidden likes stay missing in nullable integer counts
+        hidden = read_parquet(url, columns, [("snippet.categoryId", "==", 22)])
+        assert hidden["statistics.likeCount"].dtype == "Int64"
+        assert hidden["statistics.likeCount"].isna().any()
+        print("counts ok")
+
+        # Only the footer and some column chunks are downloaded
+        size = os.path.getsize(path)
+        fetched = _fetched_bytes(url, columns, filters)
+        print(f"file: {size:,} bytes, fetched: {fetched:,} bytes")
+        assert fetched < size / 2
+
+        server.shutdown()
+        server.server_close()
+
+
+def _fetched_bytes(url, columns, filters):
+    """Returns bytes downloaded by read_parquet for the given query."""
+    files = []
+    original = remote.HTTPRangeFile
+
+    class Counting(original):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            files.append(self)
+
+    remote.HTTPRangeFile = Counting
+    try:
+        read_parquet(url, columns, filters)
+    finally:
+        remote.HTTPRangeFile = original
+
+    return sum(file.bytes_read for file in files)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Checks ytdb.store.ResponseLog appends, reads and torn record handling.
+
+Run from this directory: python test_response_log.py
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from ytdb.store import ResponseLog
+
+EXAMPLE = os.path.join(os.path.dirname(__file__), "..", "test_reader", "example_data", "trending1.json")
+
+
+def main():
+    with open(EXAMPLE) as f:
+        response = json.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = ResponseLog(os.path.join(tmp, "responses"), fsync=False)
+        times = ["2022-09-14T23:00:00Z", "2022-09-15T00:00:00Z", "2022-09-15T01:00:00Z"]
+        for query_time in times:
+            log.append(response, query_time, store="yt_trending", region="US")
+
+        # One segment per day, records in order and unchanged
+        assert [os.path.basename(path) for path in log.segments()] == \
+            ["2022-09-14.wal", "2022-09-15.wal"]
+        records = list(log.records())
+        assert [meta["queryTime"] for meta, _ in records] == times
+        assert all(r == response for _, r in records)
+        assert records[0][0] == {"queryTime": times[0], "store": "yt_trending", "region": "US"}
+
+        # Time windows skip whole segments
+        assert log.segments(start="2022-09-15") == [log.segment_path("2022-09-15")]
+        assert [meta["queryTime"] for meta, _ in log.records(end="2022-09-15T00:30:00Z")] == times[:2]
+
+        size = os.path.getsize(log.segment_path("2022-09-15"))
+        raw = len(json.dumps(response).encode())
+        assert size < raw, "records are not compressed"
+        print(f"append/read ok: {size / 2} bytes per record, {raw} raw")
+
+        # A torn record is skipped by readers and cut off by the next writer
+        path = log.segment_path("2022-09-15")
+        with open(path, "ab") as f:
+            f.write(ResponseLog.header.pack(1000, 5000) + b"torn")
+        assert len(list(log.read_segment(path))) == 2
+
+        ResponseLog(log.root).append(response, "2022-09-15T02:00:00Z")
+        assert len(list(log.read_segment(path))) == 3
+        print("torn record ok")
+
+        # Sequential reads
+        for i in range(200):
+            log.append(response, "2022-09-16T00:00:00Z", store="yt_categories")
+        ts = time.perf_counter()
+        count = sum(1 for _ in log.read_segment(log.segment_path("2022-09-16")))
+        seconds = time.perf_counter() - ts
+        assert count == 200
+        print(f"read ok: {count / seconds:.0f} records/s")
+
+
+if __name__ == "__main__":
+    main()